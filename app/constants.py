@@ -1,10 +1,16 @@
 import pathlib
 
+import PyQt5.QtCore as QtC
+
 APP_NAME = 'Image Library'
 VERSION = '4.0'
 DB_SETUP_FILE = pathlib.Path('app/data_access/setup.sql').absolute()
 CONFIG_FILE = pathlib.Path('config.ini').absolute()
 ERROR_LOG_FILE = pathlib.Path('logs/errors.log').absolute()
+# Per-user cache directory, independent of the directory the app is launched from
+THUMBNAILS_CACHE_DIR = pathlib.Path(
+    QtC.QStandardPaths.writableLocation(QtC.QStandardPaths.GenericCacheLocation) or pathlib.Path.home() / '.cache'
+) / 'image_library' / 'thumbnails'
 ICONS_DIR = pathlib.Path('app/assets/icons/').absolute()
 LANG_DIR = pathlib.Path('app/assets/lang/').absolute()
 GRAMMAR_FILE = pathlib.Path('app/queries/grammar.lark').absolute()
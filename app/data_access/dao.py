@@ -1,14 +1,121 @@
 import abc
+import functools
+import itertools
 import pathlib
 import re
 import sqlite3
+import threading
 import typing as typ
+import weakref
 
 from .. import utils
+from ..logging import logger
+
+
+class _ThreadConnection:
+    """Holds the connection checked out by a thread other than the main one. It is only referenced by the thread’s
+    local storage, which is cleared when the thread ends or, in Qt thread pools, after each runnable. The connection
+    then goes back to the pool of idle connections.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+
+class _DatabaseConnections:
+    """Connections to a single database, shared by all its DAOs.
+    The main thread, where all GUI writes happen, uses a single connection. Every other thread checks out one of a
+    pool of long-lived connections, as SQLite isolates transactions per connection, not per thread. Reusing
+    connections avoids opening and configuring a new one for each runnable and keeps their page caches warm.
+    """
+    _generations = itertools.count()
+    _MAX_IDLE_CONNECTIONS = 8
+
+    def __init__(self, database: pathlib.Path):
+        self.main = open_connection(database)
+        # Serializes write operations of all threads
+        self.lock = threading.RLock()
+        # Distinguishes data versions of connections opened one after another to the same database
+        self.generation = next(self._generations)
+        self.references = 0
+        # Number of write operations performed through DAOs, incremented once they are done
+        self.writes = 0
+        self._database = database
+        self._pool_lock = threading.Lock()
+        self._idle_connections: typ.List[sqlite3.Connection] = []
+        self._threads_connections: typ.MutableSet[_ThreadConnection] = weakref.WeakSet()
+        self._local = threading.local()
+        self._closed = False
+
+    def get(self) -> sqlite3.Connection:
+        """Returns the connection to use in the current thread, checking one out if needed."""
+        if threading.current_thread() is threading.main_thread():
+            return self.main
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = self._check_out()
+        return holder.connection
+
+    def _check_out(self) -> _ThreadConnection:
+        """Takes an idle connection or opens a new one if there are none.
+        It is checked back in once the returned holder is garbage-collected.
+        """
+        with self._pool_lock:
+            connection = self._idle_connections.pop() if self._idle_connections else None
+        if connection is None:
+            connection = open_connection(self._database)
+        holder = _ThreadConnection(connection)
+        weakref.finalize(holder, self._check_in, connection)
+        with self._pool_lock:
+            self._threads_connections.add(holder)
+        return holder
+
+    def _check_in(self, connection: sqlite3.Connection):
+        """Puts back the given connection into the pool. It is closed if the pool is full or has been closed."""
+        with self._pool_lock:
+            if not self._closed and len(self._idle_connections) < self._MAX_IDLE_CONNECTIONS:
+                try:
+                    if connection.in_transaction:
+                        connection.rollback()
+                except sqlite3.Error as e:
+                    logger.exception(e)
+                else:
+                    self._idle_connections.append(connection)
+                    return
+        connection.close()
+
+    def close(self):
+        """Closes all connections."""
+        with self._pool_lock:
+            self._closed = True
+            connections = self._idle_connections + [holder.connection for holder in self._threads_connections]
+            self._idle_connections = []
+        for connection in connections:
+            connection.close()
+        self.main.close()
+
+
+# Connections of each database, shared by all DAOs
+_connections: typ.Dict[pathlib.Path, _DatabaseConnections] = {}
+_connections_lock = threading.Lock()
+
+
+def _release(key: pathlib.Path, connections: _DatabaseConnections):
+    """Releases a DAO’s reference to the connections of a database. They are closed once no DAO uses them."""
+    with _connections_lock:
+        connections.references -= 1
+        if connections.references > 0:
+            return
+        if _connections.get(key) is connections:
+            del _connections[key]
+    connections.close()
 
 
 class DAO(abc.ABC):
-    """Base class for DAO objects. It defines 'REGEX', 'RINSTR' and 'SIMILAR' functions to use in SQL queries."""
+    """Base class for DAO objects. It defines 'REGEX', 'RINSTR' and 'SIMILAR' functions to use in SQL queries.
+
+    All DAOs of a same database share their connections: one for the main thread and a pool for other threads.
+    """
 
     def __init__(self, database: pathlib.Path):
         """Initializes this DAO using the given database.
@@ -16,21 +123,81 @@ class DAO(abc.ABC):
         :param database: The database file to connect to.
         """
         self._database_path = database
-        self._connection = sqlite3.connect(str(self._database_path))
-        # Disable autocommit when BEGIN has been called.
-        self._connection.isolation_level = None
-        self._connection.create_function('REGEXP', 2, self._regexp, deterministic=True)
-        self._connection.create_function('RINSTR', 2, self._rinstr, deterministic=True)
-        self._connection.create_function('SIMILAR', 2, self._similarity)
-        self._connection.execute('PRAGMA foreign_keys = ON')
+        key = database.absolute()
+        with _connections_lock:
+            if key not in _connections:
+                _connections[key] = _DatabaseConnections(database)
+            self._connections = _connections[key]
+            self._connections.references += 1
+        self._lock = self._connections.lock
+        # Also releases the connections if this DAO is garbage-collected without being closed
+        self._release = weakref.finalize(self, _release, key, self._connections)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """The connection to use in the current thread."""
+        return self._connections.get()
 
     @property
     def database_path(self) -> pathlib.Path:
         return self._database_path
 
+    def data_version(self) -> typ.Optional[typ.Tuple[int, int, int]]:
+        """Returns a value that changes whenever the database is modified, be it through any of the DAOs’
+        connections or any other one. Values returned from different threads can be compared.
+
+        :return: The value or None if an exception occured.
+        """
+        main = self._connections.main
+        try:
+            # Always read from the main connection, while no write transaction is pending on it
+            with self._lock:
+                cursor = main.execute('PRAGMA data_version')
+                # data_version only reflects changes committed by other connections
+                version = self._connections.generation, main.total_changes, cursor.fetchone()[0]
+                cursor.close()
+        except sqlite3.Error as e:
+            logger.exception(e)
+            return None
+        else:
+            return version
+
+    def writes_version(self) -> typ.Tuple[int, int]:
+        """Returns a value that changes after each write operation performed through any DAO of the same database.
+        Unlike data_version(), it runs no query and does not wait for pending writes, but changes made through other
+        connections are only reflected once notify_external_changes() has been called.
+        """
+        return self._connections.generation, self._connections.writes
+
+    def notify_external_changes(self):
+        """Tells DAOs of the same database that it was modified through a connection they do not manage."""
+        with self._lock:
+            self._connections.writes += 1
+
     def close(self):
-        """Closes database connection."""
-        self._connection.close()
+        """Releases this DAO’s connections. They are only closed once all DAOs of the same database are."""
+        self._release()
+
+    def _execute_in_savepoint(self, query: str, args: typ.Sequence) -> bool:
+        """Executes the given statement in its own savepoint so that a constraint violation does not abort the
+        current transaction.
+
+        :param query: The statement.
+        :param args: The statement’s arguments.
+        :return: True if the statement succeeded, False if it violated a constraint and was rolled back.
+        :raises sqlite3.Error: If any other error occurred; the transaction should then be rolled back.
+        """
+        self._connection.execute('SAVEPOINT statement')
+        try:
+            self._connection.execute(query, args)
+        except sqlite3.IntegrityError as e:
+            logger.exception(e)
+            self._connection.execute('ROLLBACK TO statement')
+            success = False
+        else:
+            success = True
+        self._connection.execute('RELEASE statement')
+        return success
 
     @staticmethod
     def _regexp(pattern: str, string: str) -> bool:
@@ -93,3 +260,44 @@ class DAO(abc.ABC):
         :return: The resulting int.
         """
         return int.from_bytes(hash_bytes, byteorder='big', signed=False)
+
+
+def open_connection(database: pathlib.Path) -> sqlite3.Connection:
+    """Opens a new connection to the given database, configured as expected by DAOs.
+    The connection may be used from any thread.
+
+    :param database: The database file to connect to.
+    :return: The connection.
+    """
+    connection = sqlite3.connect(str(database), check_same_thread=False)
+    # Disable autocommit when BEGIN has been called.
+    connection.isolation_level = None
+    connection.create_function('REGEXP', 2, DAO._regexp, deterministic=True)
+    connection.create_function('RINSTR', 2, DAO._rinstr, deterministic=True)
+    connection.create_function('SIMILAR', 2, DAO._similarity)
+    connection.execute('PRAGMA foreign_keys = ON')
+    # Readers do not block writers and vice versa
+    connection.execute('PRAGMA journal_mode = WAL')
+    # Durable enough in WAL mode, only the last transactions may be lost on power failure
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.execute('PRAGMA cache_size = -65536')  # 64 MiB
+    connection.execute('PRAGMA mmap_size = 268435456')  # 256 MiB
+    return connection
+
+
+def write_operation(method):
+    """Decorator for DAO methods that modify the database.
+    It prevents them from running concurrently on the shared connection and updates the writes version.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: DAO, *args, **kwargs):
+        # noinspection PyProtectedMember
+        with self._lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                # noinspection PyProtectedMember
+                self._connections.writes += 1
+
+    return wrapper
@@ -5,7 +5,7 @@ import typing as typ
 
 import sympy as sp
 
-from .dao import DAO
+from .dao import DAO, write_operation
 from .tags_dao import TagsDao
 from .. import model, utils
 from ..i18n import translate as _t
@@ -15,6 +15,9 @@ from ..logging import logger
 class ImageDao(DAO):
     """This class manages images."""
 
+    # Maximum number of values bound to a single query, well below SQLite’s limit
+    _BATCH_SIZE = 500
+
     def get_images(self, tags: sp.Basic) -> typ.Optional[typ.List[model.Image]]:
         """Returns all images matching the given tags.
 
@@ -89,6 +92,40 @@ class ImageDao(DAO):
             cursor.close()
             return tags
 
+    def get_images_tags(self, image_ids: typ.Sequence[int], tags_dao: TagsDao) \
+            -> typ.Optional[typ.Dict[int, typ.List[model.Tag]]]:
+        """Returns all tags for each of the given images.
+        Tags are fetched in batches to avoid issuing one query per image.
+
+        :param image_ids: Images’ IDs.
+        :param tags_dao: Tags DAO instance.
+        :return: A dict associating each image ID to its tags or None if an exception occured.
+        """
+        image_ids = list(image_ids)
+        images_tags = {image_id: [] for image_id in image_ids}
+        tag_types = {}
+        for i in range(0, len(image_ids), self._BATCH_SIZE):
+            batch = image_ids[i:i + self._BATCH_SIZE]
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute(f"""
+                SELECT IT.image_id, T.id, T.label, T.type_id
+                FROM tags AS T, image_tag AS IT
+                WHERE IT.image_id IN ({",".join("?" * len(batch))})
+                  AND IT.tag_id = T.id
+                """, batch)
+            except sqlite3.Error as e:
+                logger.exception(e)
+                cursor.close()
+                return None
+            else:
+                for image_id, tag_id, label, type_id in cursor.fetchall():
+                    if type_id is not None and type_id not in tag_types:
+                        tag_types[type_id] = tags_dao.get_tag_type_from_id(type_id)
+                    images_tags[image_id].append(model.Tag(tag_id, label, tag_types.get(type_id)))
+                cursor.close()
+        return images_tags
+
     IMG_REGISTERED = 0
     """Indicates that the given image is already registered."""
     IMG_SIMILAR = 1
@@ -108,6 +145,24 @@ class ImageDao(DAO):
         cursor.close()
         return result is not None
 
+    def images_registered(self, image_paths: typ.Sequence[pathlib.Path]) -> typ.Set[pathlib.Path]:
+        """Tells which of the given images have already been registered.
+        Paths are looked up in batches to avoid issuing one query per image.
+
+        :param image_paths: Paths to the images.
+        :return: The subset of the given paths that are already registered.
+        """
+        paths = {str(path): path for path in image_paths}
+        keys = list(paths)
+        registered = set()
+        for i in range(0, len(keys), self._BATCH_SIZE):
+            batch = keys[i:i + self._BATCH_SIZE]
+            cursor = self._connection.cursor()
+            cursor.execute(f'SELECT path FROM images WHERE path IN ({",".join("?" * len(batch))})', batch)
+            registered.update(paths[row[0]] for row in cursor.fetchall())
+            cursor.close()
+        return registered
+
     def get_similar_images(self, image_path: pathlib.Path) \
             -> typ.Optional[typ.List[typ.Tuple[model.Image, int, float, bool]]]:
         """Returns a list of all images that may be similar to the given one.
@@ -137,6 +192,7 @@ class ImageDao(DAO):
         # Sort by: sameness (desc), distance (asc), confidence (desc), path (normal)
         return sorted(images, key=lambda e: (not e[3], e[1], -e[2], e[0]))
 
+    @write_operation
     def add_image(self, image_path: pathlib.Path, tags: typ.List[model.Tag]) -> bool:
         """Adds an image.
 
@@ -164,6 +220,7 @@ class ImageDao(DAO):
             self._connection.commit()
             return True
 
+    @write_operation
     def update_image(self, image_id: int, new_path: pathlib.Path, new_hash: typ.Union[int, None]) -> bool:
         """Sets the path of the given image.
 
@@ -186,6 +243,7 @@ class ImageDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
     def update_image_tags(self, image_id: int, tags: typ.List[model.Tag]) -> bool:
         """Sets the tags for the given image.
 
@@ -195,10 +253,7 @@ class ImageDao(DAO):
         """
         try:
             self._connection.execute('BEGIN')
-            self._connection.execute('DELETE FROM image_tag WHERE image_id = ?', (image_id,))
-            for tag in tags:
-                tag_id = self._insert_tag_if_not_exists(tag)
-                self._connection.execute('INSERT INTO image_tag(image_id, tag_id) VALUES(?, ?)', (image_id, tag_id))
+            self._set_image_tags(image_id, tags)
         except sqlite3.Error as e:
             logger.exception(e)
             self._connection.rollback()
@@ -207,6 +262,35 @@ class ImageDao(DAO):
             self._connection.commit()
             return True
 
+    @write_operation
+    def update_image_and_tags(self, image_id: int, tags: typ.Optional[typ.List[model.Tag]],
+                              new_path: typ.Optional[pathlib.Path], new_hash: typ.Union[int, None]) -> bool:
+        """Sets the tags and path of the given image in a single transaction.
+
+        :param image_id: Image’s ID.
+        :param tags: The tags to set. If None, tags are left untouched.
+        :param new_path: The new path. If None, path and hash are left untouched.
+        :param new_hash: The new hash.
+        :return: True if the image was updated, False on error.
+        """
+        try:
+            self._connection.execute('BEGIN')
+            if tags is not None:
+                self._set_image_tags(image_id, tags)
+            if new_path is not None:
+                self._connection.execute(
+                    'UPDATE images SET path = ?, hash = ? WHERE id = ?',
+                    (str(new_path), self.encode_hash(new_hash) if new_hash is not None else None, image_id)
+                )
+        except sqlite3.Error as e:
+            logger.exception(e)
+            self._connection.rollback()
+            return False
+        else:
+            self._connection.commit()
+            return True
+
+    @write_operation
     def delete_image(self, image_id: int) -> bool:
         """Deletes the given image.
 
@@ -224,6 +308,35 @@ class ImageDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
+    def delete_images(self, image_ids: typ.Iterable[int]) -> typ.Optional[typ.Dict[int, bool]]:
+        """Deletes the given images in a single transaction. Images are deleted in batches; if a batch fails,
+        its images are deleted one by one so that a single failure does not prevent the others from being deleted.
+
+        :param image_ids: IDs of the images to delete.
+        :return: A dict associating each image ID to True if it was deleted, False otherwise;
+            or None if the transaction failed.
+        """
+        image_ids = list(image_ids)
+        results = {}
+        try:
+            self._connection.execute('BEGIN')
+            for i in range(0, len(image_ids), self._BATCH_SIZE):
+                batch = image_ids[i:i + self._BATCH_SIZE]
+                query = f'DELETE FROM images WHERE id IN ({",".join("?" * len(batch))})'
+                if self._execute_in_savepoint(query, batch):
+                    results.update(dict.fromkeys(batch, True))
+                else:
+                    for image_id in batch:
+                        results[image_id] = self._execute_in_savepoint('DELETE FROM images WHERE id = ?', (image_id,))
+        except sqlite3.Error as e:
+            logger.exception(e)
+            self._connection.rollback()
+            return None
+        else:
+            self._connection.commit()
+            return results
+
     def _get_image(self, result: typ.Tuple[int, str, bytes]) -> model.Image:
         """Creates an Image object from a result tuple."""
         return model.Image(
@@ -232,6 +345,19 @@ class ImageDao(DAO):
             hash=self.decode_hash(result[2]) if result[2] is not None else None
         )
 
+    def _set_image_tags(self, image_id: int, tags: typ.List[model.Tag]):
+        """Replaces the tags of the given image, inserting those that do not exist yet.
+        Must be called inside a transaction, which is neither committed nor rolled back.
+
+        :param image_id: Image’s ID.
+        :param tags: The tags to set.
+        :raises sqlite3.Error: If any statement failed.
+        """
+        self._connection.execute('DELETE FROM image_tag WHERE image_id = ?', (image_id,))
+        for tag in tags:
+            tag_id = self._insert_tag_if_not_exists(tag)
+            self._connection.execute('INSERT INTO image_tag(image_id, tag_id) VALUES(?, ?)', (image_id, tag_id))
+
     def _insert_tag_if_not_exists(self, tag: model.Tag) -> int:
         """Inserts the given tag if it does not already exist.
 
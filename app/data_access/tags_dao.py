@@ -1,18 +1,28 @@
 import sqlite3
+import threading
 import typing as typ
 
 import PyQt5.QtGui as QtG
 
-from .dao import DAO
+from .dao import DAO, write_operation
 from .. import model
 from ..logging import logger
 
 _T = typ.TypeVar('_T', model.Tag, model.CompoundTag)
+# Success of each addition, update and deletion
+ChangesResults = typ.Tuple[typ.List[bool], typ.List[bool], typ.List[bool]]
 
 
 class TagsDao(DAO):
     """This class manages tags and tag types."""
 
+    # Maximum number of values bound to a single query, well below SQLite’s limit
+    _BATCH_SIZE = 500
+
+    # Results of get_all_tags without counts, shared by all DAOs, with the writes version they were fetched at
+    _tags_cache: typ.Dict[tuple, typ.Tuple[typ.Tuple[int, int], list]] = {}
+    _tags_cache_lock = threading.Lock()
+
     def get_all_types(self) -> typ.Optional[typ.List[model.TagType]]:
         """Returns all tag types.
 
@@ -59,6 +69,19 @@ class TagsDao(DAO):
         tag_type = self.get_tag_type_from_symbol(s[0]) if has_type else None
         return model.Tag(0, label, tag_type)
 
+    def create_tags_from_strings(self, strings: typ.Iterable[str]) -> typ.List[model.Tag]:
+        """Creates new Tag instances from the given strings. Tag types are fetched only once for all strings.
+
+        :param strings: The strings to parse.
+        :return: The corresponding tags.
+        """
+        types_by_symbol = {tag_type.symbol: tag_type for tag_type in self.get_all_types() or []}
+        tags = []
+        for s in strings:
+            tag_type = types_by_symbol.get(s[0])
+            tags.append(model.Tag(0, s[1:] if tag_type else s, tag_type))
+        return tags
+
     def get_tag_from_label(self, label: str) -> typ.Optional[model.Tag]:
         """Returns the tag that has the given label.
 
@@ -119,6 +142,7 @@ class TagsDao(DAO):
                 return self._get_tag_type(results[0])
             return None
 
+    @write_operation
     def add_type(self, tag_type: model.TagType) -> bool:
         """Adds a tag type.
 
@@ -137,6 +161,7 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
     def update_type(self, tag_type: model.TagType) -> bool:
         """Updates a tag type.
 
@@ -155,6 +180,7 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
     def delete_type(self, type_id: int) -> bool:
         """Deletes the given tag type.
 
@@ -172,6 +198,25 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
+    def apply_type_changes(self, added: typ.List[model.TagType], updated: typ.List[model.TagType],
+                           deleted_ids: typ.List[int]) -> typ.Optional[ChangesResults]:
+        """Adds, updates and deletes tag types in a single transaction.
+        Each change is applied in its own savepoint so that a failing one does not prevent the others.
+
+        :param added: The types to add.
+        :param updated: The types to update.
+        :param deleted_ids: IDs of the types to delete.
+        :return: Whether each addition, update and deletion succeeded or None if no change could be applied.
+        """
+        return self._apply_changes(
+            [('INSERT INTO tag_types (label, symbol, color) VALUES (?, ?, ?)', (t.label, t.symbol, t.color.rgb()))
+             for t in added],
+            [('UPDATE tag_types SET label = ?, symbol = ?, color = ? WHERE id = ?',
+              (t.label, t.symbol, t.color.rgb(), t.id)) for t in updated],
+            [('DELETE FROM tag_types WHERE id = ?', (ident,)) for ident in deleted_ids]
+        )
+
     def get_all_tags(self, tag_class: typ.Type[_T] = None, sort_by_label: bool = False, get_count: bool = False) \
             -> typ.Optional[typ.Union[typ.List[typ.Tuple[_T, int]], typ.List[_T]]]:
         """Returns all tags. Result can be sorted by label. You can also query use count for each tag.
@@ -181,6 +226,17 @@ class TagsDao(DAO):
         :param get_count: If true, result will be a list of tuples containing the tag and its use count.
         :return: The list of tags or tag/count pairs or None if an exception occured.
         """
+        # Use counts change whenever images are edited, only cache plain tag lists
+        cache_key = None
+        if not get_count:
+            # Read before fetching so that tags written in the meantime are not cached as up to date
+            version = self.writes_version()
+            cache_key = (self._database_path.absolute(), tag_class, sort_by_label)
+            with self._tags_cache_lock:
+                cached = self._tags_cache.get(cache_key)
+                if cached and cached[0] == version:
+                    return list(cached[1])
+
         counts = {}
         if get_count:
             cursor_ = self._connection.cursor()
@@ -232,8 +288,36 @@ class TagsDao(DAO):
                         tags.append(tag)
 
             cursor.close()
+            if cache_key:
+                with self._tags_cache_lock:
+                    # noinspection PyUnboundLocalVariable
+                    self._tags_cache[cache_key] = (version, list(tags))
             return tags
 
+    def get_all_tag_labels(self, tag_class: typ.Type[_T] = None) -> typ.Optional[typ.List[str]]:
+        """Returns the labels of all tags, sorted using lexicographical ordering.
+
+        :param tag_class: Sets type of tags whose labels to return. If None all labels wil be returned.
+        :return: The list of labels or None if an exception occured.
+        """
+        query = 'SELECT label FROM tags'
+        if tag_class == model.Tag:
+            query += ' WHERE definition IS NULL'
+        elif tag_class == model.CompoundTag:
+            query += ' WHERE definition IS NOT NULL'
+        query += ' ORDER BY label'
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(query)
+        except sqlite3.Error as e:
+            logger.exception(e)
+            cursor.close()
+            return None
+        else:
+            labels = [label for label, in cursor.fetchall()]
+            cursor.close()
+            return labels
+
     def get_all_tag_types(self, sort_by_symbol: bool = False, get_count: bool = False) \
             -> typ.Optional[typ.Union[typ.List[model.TagType], typ.List[typ.Tuple[model.TagType, int]]]]:
         """Returns all tag types.
@@ -317,6 +401,33 @@ class TagsDao(DAO):
                 return None
             return model.Tag if results[0][0] is None else model.CompoundTag
 
+    def get_tag_classes(self, tag_names: typ.Iterable[str]) \
+            -> typ.Optional[typ.Dict[str, typ.Union[typ.Type[model.Tag], typ.Type[model.CompoundTag]]]]:
+        """Returns the type of each of the given tags in a single query.
+
+        :param tag_names: Tags’ names.
+        :return: A dict associating each existing tag’s name to its class or None if an exception occured.
+            Names of tags that do not exist are absent from the dict.
+        """
+        tag_names = list(set(tag_names))
+        classes = {}
+        cursor = self._connection.cursor()
+        try:
+            for i in range(0, len(tag_names), self._BATCH_SIZE):
+                batch = tag_names[i:i + self._BATCH_SIZE]
+                cursor.execute(f'SELECT label, definition FROM tags WHERE label IN ({", ".join("?" * len(batch))})',
+                               batch)
+                classes.update({label: model.Tag if definition is None else model.CompoundTag
+                                for label, definition in cursor.fetchall()})
+        except sqlite3.Error as e:
+            logger.exception(e)
+            cursor.close()
+            return None
+        else:
+            cursor.close()
+            return classes
+
+    @write_operation
     def add_compound_tag(self, tag: model.CompoundTag) -> bool:
         """Adds a compound tag.
 
@@ -335,6 +446,7 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
     def update_tag(self, tag: model.Tag) -> bool:
         """Updates the given tag.
 
@@ -358,6 +470,7 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
     def delete_tag(self, tag_id: int) -> bool:
         """Deletes the given tag.
 
@@ -375,6 +488,57 @@ class TagsDao(DAO):
             cursor.close()
             return True
 
+    @write_operation
+    def apply_tag_changes(self, added: typ.List[model.CompoundTag], updated: typ.List[model.Tag],
+                          deleted_ids: typ.List[int]) -> typ.Optional[ChangesResults]:
+        """Adds compound tags, updates and deletes tags in a single transaction.
+        Each change is applied in its own savepoint so that a failing one does not prevent the others.
+
+        :param added: The compound tags to add.
+        :param updated: The tags to update.
+        :param deleted_ids: IDs of the tags to delete.
+        :return: Whether each addition, update and deletion succeeded or None if no change could be applied.
+        """
+
+        def type_id(tag: model.Tag) -> typ.Optional[int]:
+            return tag.type.id if tag.type is not None else None
+
+        def update(tag: model.Tag) -> typ.Tuple[str, tuple]:
+            if isinstance(tag, model.CompoundTag):
+                return ('UPDATE tags SET label = ?, type_id = ?, definition = ? WHERE id = ?',
+                        (tag.label, type_id(tag), tag.definition, tag.id))
+            return 'UPDATE tags SET label = ?, type_id = ? WHERE id = ?', (tag.label, type_id(tag), tag.id)
+
+        return self._apply_changes(
+            [('INSERT INTO tags (label, type_id, definition) VALUES (?, ?, ?)', (t.label, type_id(t), t.definition))
+             for t in added],
+            [update(t) for t in updated],
+            [('DELETE FROM tags WHERE id = ?', (ident,)) for ident in deleted_ids]
+        )
+
+    def _apply_changes(self, additions: typ.List[typ.Tuple[str, tuple]], updates: typ.List[typ.Tuple[str, tuple]],
+                       deletions: typ.List[typ.Tuple[str, tuple]]) -> typ.Optional[ChangesResults]:
+        """Executes the given statements in a single transaction, each one in its own savepoint.
+        Additions are executed first, then deletions and updates.
+
+        :param additions: Queries and arguments of the additions.
+        :param updates: Queries and arguments of the updates.
+        :param deletions: Queries and arguments of the deletions.
+        :return: Whether each addition, update and deletion succeeded or None if the transaction failed.
+        """
+        try:
+            self._connection.execute('BEGIN')
+            added = [self._execute_in_savepoint(query, args) for query, args in additions]
+            deleted = [self._execute_in_savepoint(query, args) for query, args in deletions]
+            updated = [self._execute_in_savepoint(query, args) for query, args in updates]
+        except sqlite3.Error as e:
+            logger.exception(e)
+            self._connection.rollback()
+            return None
+        else:
+            self._connection.commit()
+            return added, updated, deleted
+
     def _get_tag(self, result: typ.Tuple[int, str, typ.Optional[str], typ.Optional[int]]) -> model.Tag:
         """Creates a Tag object based on the given result tuple."""
         if result[2]:
@@ -1,7 +1,11 @@
+import collections
 import ctypes
+import functools
+import itertools
 import os
 import pathlib
 import re
+import stat
 import sys
 import typing as typ
 
@@ -21,6 +25,8 @@ class Application(QtW.QMainWindow):
 
     _PATHS_TAB = 'paths'
     _THUMBS_TAB = 'thumnails'
+    # Number of paths checked against the database at once when adding images
+    _ADD_BATCH_SIZE = 500
 
     def __init__(self):
         super().__init__()
@@ -32,7 +38,9 @@ class Application(QtW.QMainWindow):
 
         self._image_dao = da.ImageDao(config.CONFIG.database_path)
         self._tags_dao = da.TagsDao(config.CONFIG.database_path)
-        self._search_thread = None
+        self._search = None
+        # Keep running deletions alive until they finish
+        self._files_deletions: typ.Set[_DeleteFilesRunnable] = set()
 
         self._operations_dialog_state: typ.Optional[dialogs.OperationsDialog.State] = None
 
@@ -49,8 +57,6 @@ class Application(QtW.QMainWindow):
 
         self._init_menu()
 
-        self.setCentralWidget(QtW.QWidget(parent=self))
-
         self._tag_tree = components.TagTree(self._on_delete_item, self._on_insert_tag, parent=self)
 
         path_list = image_list.ImageList(self._list_selection_changed, lambda image: self._edit_images([image]),
@@ -216,15 +222,10 @@ class Application(QtW.QMainWindow):
             lambda: dialogs.AboutDialog(self).show()
         )
 
-    def _center(self):
-        """Centers the application window."""
-        qr = self.frameGeometry()
-        cp = QtW.QDesktopWidget().availableGeometry().center()
-        qr.moveCenter(cp)
-        self.move(qr.topLeft())
-
     def _move_images(self):
         images = self._current_tab().selected_images()
+        for image in images:
+            utils.thumbs.CACHE.invalidate(image.path)
         dialog = dialogs.MoveImagesDialog(images, parent=self)
         dialog.set_on_close_action(lambda _: self._fetch_images())
         dialog.show()
@@ -234,14 +235,19 @@ class Application(QtW.QMainWindow):
             self._operations_dialog_state = d.state
             self._fetch_and_refresh()
 
-        tags = list(map(lambda t: t.label, self._tags_dao.get_all_tags(tag_class=model.Tag, sort_by_label=True)))
+        tags = self._tags_dao.get_all_tag_labels(tag_class=model.Tag)
         dialog = dialogs.OperationsDialog(tags, state=self._operations_dialog_state, parent=self)
         dialog.set_on_close_action(_on_close)
         dialog.show()
 
     def _open_sql_terminal(self):
+        def _on_close(_):
+            # The terminal uses a connection of its own
+            self._tags_dao.notify_external_changes()
+            self._fetch_and_refresh()
+
         dialog = dialogs.CommandLineDialog(parent=self)
-        dialog.set_on_close_action(lambda _: self._fetch_and_refresh())
+        dialog.set_on_close_action(_on_close)
         dialog.show()
 
     def _show_settings_dialog(self):
@@ -265,43 +271,63 @@ class Application(QtW.QMainWindow):
         if directory := utils.gui.open_directory_chooser(directory=config.CONFIG.last_directory, parent=self):
             config.CONFIG.last_directory = directory
             try:
-                files = utils.files.get_files_from_directory(directory)
+                found = self._add_images(utils.files.get_files_from_directory(directory))
             except RecursionError as e:
                 utils.gui.show_error(_t('popup.maximum_recursion.text', depth=str(e)), parent=self)
             else:
-                if not files:
+                if not found:
                     utils.gui.show_info(_t('popup.empty_directory.text'), parent=self)
-                else:
-                    self._add_images(files)
 
-    def _add_images(self, image_paths: typ.List[pathlib.Path]):
+    def _add_images(self, image_paths: typ.Iterable[pathlib.Path]) -> bool:
         """Opens the 'Add Images' dialog then adds the images to the database.
-        Checks for potential duplicates.
-        """
-        if image_paths:
-            registered = [self._image_dao.image_registered(p) for p in image_paths]
-
-            if all(registered):
-                if len(registered) > 1:
-                    text = _t('popup.images_registered.text')
-                else:
-                    text = _t('popup.image_registered.text')
-                utils.gui.show_info(text, parent=self)
-                return
+        Checks for potential duplicates. Paths are consumed in batches, so only unregistered images are kept in memory.
 
-            if any(registered):
-                utils.gui.show_info(_t('popup.some_images_registered.text'), parent=self)
+        :param image_paths: Paths of the images to add.
+        :return: False if no paths were given, True otherwise.
+        :raise RecursionError: If iterating over the paths raises it.
+        """
+        progress_dialog = dialogs.ProgressDialog(parent=self)
+        progress_dialog.setRange(0, 0)
+        progress_dialog.setLabelText(_t('popup.progress.files_found', amount=0))
+        # Show it right away, the window being modal it also prevents other actions while paths are processed
+        progress_dialog.show()
+        images_to_add = []
+        total = 0
+        paths = iter(image_paths)
+        try:
+            while batch := list(itertools.islice(paths, self._ADD_BATCH_SIZE)):
+                registered_paths = self._image_dao.images_registered(batch)
+                images_to_add.extend(model.Image(id=0, path=path, hash=None)
+                                     for path in batch if path not in registered_paths)
+                total += len(batch)
+                progress_dialog.setLabelText(_t('popup.progress.files_found', amount=total))
+                QtW.QApplication.processEvents()
+                if progress_dialog.wasCanceled():
+                    return True
+        finally:
+            progress_dialog.reset()
+            progress_dialog.deleteLater()
+
+        if total == 0:
+            return False
+
+        if not images_to_add:
+            if total > 1:
+                text = _t('popup.images_registered.text')
+            else:
+                text = _t('popup.image_registered.text')
+            utils.gui.show_info(text, parent=self)
+            return True
 
-            images_to_add = []
-            for i, path in enumerate(image_paths):
-                if not registered[i]:
-                    images_to_add.append(model.Image(id=0, path=path, hash=None))
+        if len(images_to_add) < total:
+            utils.gui.show_info(_t('popup.some_images_registered.text'), parent=self)
 
-            dialog = dialogs.EditImageDialog(self._image_dao, self._tags_dao, show_skip=len(images_to_add) > 1,
-                                             mode=dialogs.EditImageDialog.ADD, parent=self)
-            dialog.set_on_close_action(lambda _: self._fetch_and_refresh())
-            dialog.set_images(images_to_add, {})
-            dialog.show()
+        dialog = dialogs.EditImageDialog(self._image_dao, self._tags_dao, show_skip=len(images_to_add) > 1,
+                                         mode=dialogs.EditImageDialog.ADD, parent=self)
+        dialog.set_on_close_action(lambda _: self._fetch_and_refresh())
+        dialog.set_images(images_to_add, {})
+        dialog.show()
+        return True
 
     def _rename_image(self):
         """Opens the 'Rename Image' dialog then renames the selected image."""
@@ -328,6 +354,8 @@ class Application(QtW.QMainWindow):
                             utils.gui.show_error(_t('popup.rename_file_error.text'), parent=self)
                             # Rollback changes
                             self._image_dao.update_image(image.id, image.path, image.hash)
+                        else:
+                            utils.thumbs.CACHE.invalidate(image.path)
                         self._fetch_images()
 
     def _replace_image(self):
@@ -335,6 +363,7 @@ class Application(QtW.QMainWindow):
         images = self._current_tab().selected_images()
         if len(images) == 1:
             image = images[0]
+            utils.thumbs.CACHE.invalidate(image.path)
             dialog = dialogs.EditImageDialog(self._image_dao, self._tags_dao, mode=dialogs.EditImageDialog.REPLACE,
                                              parent=self)
             dialog.set_on_close_action(lambda _: self._fetch_and_refresh())
@@ -363,12 +392,10 @@ class Application(QtW.QMainWindow):
         if images:
             dialog = dialogs.EditImageDialog(self._image_dao, self._tags_dao, show_skip=len(images) > 1, parent=self)
             dialog.set_on_close_action(lambda _: self._fetch_and_refresh())
-            tags = {}
-            for image in images:
-                t = self._image_dao.get_image_tags(image.id, self._tags_dao)
-                if t is None:
-                    utils.gui.show_error(_t('popup.tag_load_error.text'), parent=self)
-                tags[image.id] = t
+            tags = self._image_dao.get_images_tags([image.id for image in images], self._tags_dao)
+            if tags is None:
+                utils.gui.show_error(_t('popup.tag_load_error.text'), parent=self)
+                tags = {}
             dialog.set_images(images, tags)
             dialog.show()
 
@@ -381,19 +408,30 @@ class Application(QtW.QMainWindow):
             delete = dialog.exec_()
             delete_from_disk = delete and dialog.delete_from_disk()
             if delete:
-                errors = []
-                for item in images:
-                    ok = self._image_dao.delete_image(item.id)
-                    if ok and delete_from_disk:
-                        try:
-                            item.path.unlink()
-                        except OSError as e:
-                            logger.exception(e)
-                            errors.append(str(item.path))
-                if errors:
+                results = self._image_dao.delete_images(image.id for image in images) or {}
+                deleted = [image for image in images if results.get(image.id)]
+                errors = [str(image.path) for image in images if not results.get(image.id)]
+                for image in deleted:
+                    utils.thumbs.CACHE.invalidate(image.path)
+                if delete_from_disk and deleted:
+                    # Errors are reported once all files have been deleted
+                    deletion = _DeleteFilesRunnable([image.path for image in deleted], errors)
+                    deletion.signals.finished.connect(self._on_files_deleted)
+                    self._files_deletions.add(deletion)
+                    QtC.QThreadPool.globalInstance().start(deletion)
+                elif errors:
                     utils.gui.show_error(_t('popup.delete_image_error.text', files='\n'.join(errors)), parent=self)
                 self._fetch_images()
 
+    def _on_files_deleted(self, deletion: '_DeleteFilesRunnable'):
+        """Called when files of deleted images have been deleted from the disk.
+
+        :param deletion: The deletion that just finished.
+        """
+        self._files_deletions.discard(deletion)
+        if deletion.errors:
+            utils.gui.show_error(_t('popup.delete_image_error.text', files='\n'.join(deletion.errors)), parent=self)
+
     def _edit_tags(self):
         """Opens the 'Edit Tags' dialog. Tags tree is refreshed afterwards."""
         dialog = dialogs.EditTagsDialog(self._tags_dao, parent=self)
@@ -428,32 +466,40 @@ class Application(QtW.QMainWindow):
 
     def _refresh_tree_and_completer(self):
         """Refreshes the tags tree and query completer."""
-        tags = self._tags_dao.get_all_tags(sort_by_label=True)
-        self._tag_tree.refresh(self._tags_dao.get_all_tag_types(), tags)
-        self._input_field.set_completer_model(map(lambda t: t.label, tags))
+        self._tag_tree.refresh(self._tags_dao.get_all_tag_types(), self._tags_dao.get_all_tags(sort_by_label=True))
+        self._input_field.set_completer_model(self._tags_dao.get_all_tag_labels())
 
     def _fetch_images(self, tagless_images: bool = False):
-        """Fetches images matching the typed query. Starts a search thread to avoid freezing the whole application.
+        """Fetches images matching the typed query. The search runs in the global thread pool to avoid freezing the
+        whole application.
 
         :param tagless_images: Whether to fetch tagless images. If True, the query is ignored.
         """
         tags = self._input_field.text().strip()
         if len(tags) > 0 or tagless_images:
+            if self._search is not None:
+                # Results of any search still in flight are now stale
+                self._search.cancel()
             self._search_btn.setEnabled(False)
             self._input_field.setEnabled(False)
-            self._search_thread = _SearchThread(tags, tagless_images=tagless_images)
-            self._search_thread.finished.connect(self._on_fetch_done)
-            self._search_thread.start()
-
-    def _on_fetch_done(self):
-        """Called when image searching is done."""
-        if self._search_thread.failed:
-            utils.gui.show_error(self._search_thread.error, parent=self)
+            self._search = _SearchRunnable(tags, tagless_images=tagless_images)
+            self._search.signals.finished.connect(self._on_fetch_done)
+            QtC.QThreadPool.globalInstance().start(self._search)
+
+    def _on_fetch_done(self, search: '_SearchRunnable'):
+        """Called when image searching is done.
+
+        :param search: The search that just finished. Its results are dropped if it was cancelled or superseded.
+        """
+        if search.cancelled or search is not self._search:
+            return
+        self._search = None
+        if search.failed:
+            utils.gui.show_error(search.error, parent=self)
             self._search_btn.setEnabled(True)
             self._input_field.setEnabled(True)
         else:
-            images = self._search_thread.fetched_images
-            images.sort(key=lambda i_: i_.path)
+            images = search.fetched_images
 
             if config.CONFIG.load_thumbnails:
                 load_thumbs = True
@@ -472,10 +518,10 @@ class Application(QtW.QMainWindow):
                 tab = self._tabbed_pane.widget(i)
                 nb = len(images) if self._tabbed_pane.tabWhatsThis(i) != self._THUMBS_TAB or load_thumbs else 0
                 self._tabbed_pane.setTabText(i, _t(self._TAB_TITLES[i], images_number=nb))
-                tab.clear()
                 if load_thumbs and config.CONFIG.load_thumbnails or not isinstance(tab, image_list.ThumbnailList):
-                    for image in images:
-                        tab.add_image(image)
+                    tab.set_images(images)
+                else:
+                    tab.clear()
             self._search_btn.setEnabled(True)
             self._input_field.setEnabled(True)
             self._input_field.setFocus()
@@ -510,21 +556,22 @@ class Application(QtW.QMainWindow):
 
     def dropEvent(self, event: QtG.QDropEvent):
         # No need to check for ValueError of _get_urls as it is already handled in dragEnterEvent and dragMoveEvent
-        files = []
-        for path in self._get_paths(event):
-            if path.is_file():
-                files.append(path)
-            else:
-                try:
-                    files.extend(utils.files.get_files_from_directory(path))
-                except RecursionError as e:
-                    utils.gui.show_error(_t('popup.maximum_recursion.text', depth=str(e)), parent=self)
-                    break
+        paths = self._get_paths(event)
+
+        def files():
+            for path, stat_result in paths:
+                if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                    yield path
+                else:
+                    yield from utils.files.get_files_from_directory(path)
+
+        try:
+            found = self._add_images(files())
+        except RecursionError as e:
+            utils.gui.show_error(_t('popup.maximum_recursion.text', depth=str(e)), parent=self)
         else:
-            if not files:
+            if not found:
                 utils.gui.show_info(_t('popup.no_files_found.text'), parent=self)
-            else:
-                self._add_images(files)
 
     @staticmethod
     def _check_drag(event: QtG.QDragMoveEvent):
@@ -540,8 +587,9 @@ class Application(QtW.QMainWindow):
             except ValueError:
                 event.ignore()
             else:
-                for path in paths:
-                    if not path.is_dir() and not utils.files.accept_image_file(path):
+                for path, stat_result in paths:
+                    is_dir = stat_result is not None and stat.S_ISDIR(stat_result.st_mode)
+                    if not is_dir and not utils.files.accept_image_file(path):
                         event.ignore()
                         break
                 else:
@@ -550,18 +598,23 @@ class Application(QtW.QMainWindow):
             event.ignore()
 
     @staticmethod
-    def _get_paths(event: QtG.QDropEvent) -> typ.List[pathlib.Path]:
-        """Extracts all file paths from the drop event.
+    def _get_paths(event: QtG.QDropEvent) -> typ.List[typ.Tuple[pathlib.Path, typ.Optional[os.stat_result]]]:
+        """Extracts all file paths from the drop event. Each file is stat’ed only once.
 
         :param event: The drop event.
-        :return: Paths of dropped files.
+        :return: Paths of dropped files with their stat result, or None if it could not be retrieved.
         :raises ValueError: If one of the URLs is not a local file.
         """
         paths = []
         for url in event.mimeData().urls():
             if not url.isLocalFile():
                 raise ValueError(_t('main_window.error.remote_URL'))
-            paths.append(pathlib.Path(url.toLocalFile()).absolute())
+            path = pathlib.Path(url.toLocalFile()).absolute()
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                stat_result = None
+            paths.append((path, stat_result))
         return paths
 
     @classmethod
@@ -596,34 +649,134 @@ class Application(QtW.QMainWindow):
             sys.exit(1)
 
 
-class _SearchThread(QtC.QThread):
-    """This thread is used to search images from a query."""
+# In-quotes pattern *MUST* be the same as PLAIN_TEXT and REGEX in grammar.lark file
+_METATAG_PATTERN = re.compile(r'(\w+\s*:\s*(["/])((\\\\)*|(.*?[^\\](\\\\)*))\2)')
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_query(query: str) -> sp.Basic:
+    """Converts a preprocessed query into a simplified sympy expression.
+    Results are cached as the conversion is costly and expressions are immutable.
+
+    :param query: The query, with all compound tags already substituted.
+    :return: The sympy expression.
+    :raises ValueError: If the query is malformed.
+    """
+    return queries.query_to_sympy(query, simplify=True)
+
+
+class _DeleteFilesSignals(QtC.QObject):
+    """Signals emitted by a _DeleteFilesRunnable, as QRunnable is not a QObject."""
+    finished = QtC.pyqtSignal(object)
+
+
+class _DeleteFilesRunnable(QtC.QRunnable):
+    """This runnable is used to delete files from the disk in the global thread pool.
+    Files are deleted concurrently in a pool of its own.
+    """
+
+    def __init__(self, paths: typ.List[pathlib.Path], errors: typ.List[str] = None):
+        """Creates a deletion for the given files.
+
+        :param paths: Paths of the files to delete.
+        :param errors: Errors that occurred before this deletion. Paths of files that could not be deleted are
+            appended to it.
+        """
+        super().__init__()
+        self.signals = _DeleteFilesSignals()
+        self._paths = paths
+        self._errors = errors if errors is not None else []
+
+    def run(self):
+        pool = QtC.QThreadPool()
+        try:
+            for path in self._paths:
+                pool.start(QtC.QRunnable.create(functools.partial(self._delete_file, path)))
+            pool.waitForDone()
+        finally:
+            self.signals.finished.emit(self)
+
+    def _delete_file(self, path: pathlib.Path):
+        """Deletes the given file. Called from worker threads, list.append is thread-safe."""
+        try:
+            path.unlink()
+        except OSError as e:
+            logger.exception(e)
+            self._errors.append(str(path))
+
+    @property
+    def errors(self) -> typ.List[str]:
+        """Returns the paths of all files that could not be deleted."""
+        return self._errors
+
+
+class _SearchSignals(QtC.QObject):
+    """Signals emitted by a _SearchRunnable, as QRunnable is not a QObject."""
+    finished = QtC.pyqtSignal(object)
+
+
+class _SearchRunnable(QtC.QRunnable):
+    """This runnable is used to search images from a query in the global thread pool."""
 
     _MAXIMUM_DEPTH = 20
+    _CACHE_SIZE = 64
+
+    # Fetched images for the most recent queries, shared by all searches
+    _cache: typ.OrderedDict[tuple, typ.List[model.Image]] = collections.OrderedDict()
+    _cache_lock = QtC.QMutex()
+    # Database data version, pattern matching any compound tag, fully expanded definitions and labels of compound
+    # tags that could not be expanded at that version
+    _compound_tags_cache: typ.Tuple[typ.Optional[tuple], typ.Optional[typ.Pattern], typ.Dict[str, str],
+                                    typ.Set[str]] = (None, None, {}, set())
 
     def __init__(self, query: str = None, tagless_images: bool = False):
-        """Creates a search thread for a query.
+        """Creates a search for a query.
 
         :param query: The query.
         :param tagless_images: Whether to fetch tagless images. If True, the query is ignored.
         """
         super().__init__()
+        self.signals = _SearchSignals()
         self._query = query
         self._tagless_images = tagless_images
         self._images = []
         self._error = None
+        self._cancelled = False
+
+    def cancel(self):
+        """Marks this search as cancelled. Remaining work is skipped and its results should be ignored."""
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns True if this search was cancelled."""
+        return self._cancelled
 
     def run(self):
-        # Cannot use application’s as SQLite connections cannot be shared between threads
+        try:
+            self._search()
+        finally:
+            self.signals.finished.emit(self)
+
+    def _search(self):
         images_dao = da.ImageDao(config.CONFIG.database_path)
+        db_version = images_dao.data_version()
+        cache_key = self._cache_key(db_version)
+        if cache_key is not None:
+            with QtC.QMutexLocker(self._cache_lock):
+                if cache_key in self._cache:
+                    self._cache.move_to_end(cache_key)
+                    self._images = list(self._cache[cache_key])
+                    return
+
         if not self._tagless_images:
-            self._preprocess()
+            self._preprocess(db_version)
 
-        if not self._error:
+        if not self._error and not self._cancelled:
             expr = sp.true
             try:
                 if not self._tagless_images:
-                    expr = queries.query_to_sympy(self._query, simplify=True)
+                    expr = _compile_query(self._query)
             except ValueError as e:
                 self._error = str(e)
             else:
@@ -631,33 +784,49 @@ class _SearchThread(QtC.QThread):
                     self._images = images_dao.get_images(expr)
                 else:
                     self._images = images_dao.get_tagless_images()
-                images_dao.close()
                 if self._images is None:
                     self._error = _t('thread.search.error.image_loading_error')
+                    return
+                # Sort here rather than in the GUI thread
+                self._images.sort(key=lambda i: i.path)
+                if cache_key is not None:
+                    with QtC.QMutexLocker(self._cache_lock):
+                        self._cache[cache_key] = list(self._images)
+                        if len(self._cache) > self._CACHE_SIZE:
+                            self._cache.popitem(last=False)
+
+    def _cache_key(self, db_version: typ.Optional[typ.Tuple[int, int, int]]) -> typ.Optional[tuple]:
+        """Returns the key under which this search’s results are cached.
+        The database’s data version is part of the key so that results are not reused after any change.
+
+        :param db_version: The database’s current data version or None if it could not be read.
+        :return: The key or None if the database could not be accessed.
+        """
+        if db_version is None:
+            return None
+        return (self._query or '').strip() if not self._tagless_images else '', self._tagless_images, db_version
 
-    def _preprocess(self):
+    def _preprocess(self, db_version: typ.Optional[typ.Tuple[int, int, int]]):
         meta_tag_values = {}
         index = 0
         # Replace metatag values with placeholders to avoid them being altered in the next step
-        # In-quotes pattern *MUST* be the same as PLAIN_TEXT and REGEX in grammar.lark file
-        while match := re.search(fr'(\w+\s*:\s*(["/])((\\\\)*|(.*?[^\\](\\\\)*))\2)', self._query):
+        while match := _METATAG_PATTERN.search(self._query):
             index += 1
             meta_tag_values[index] = match[1]
-            # noinspection PyUnresolvedReferences
-            self._query = re.sub(re.escape(match[1]), f'%%{index}%%', self._query, count=1)
+            self._query = self._query.replace(match[1], f'%%{index}%%', 1)
 
-        # Cannot use application’s as SQLite connections cannot be shared between threads
-        tags_dao = da.TagsDao(config.CONFIG.database_path)
-        compound_tags = tags_dao.get_all_tags(tag_class=model.CompoundTag)
-        previous_query = ''
-        depth = 0
-        # Replace compound tags until none are present
-        while self._query != previous_query:
-            previous_query = self._query
-            for tag in compound_tags:
-                self._query = re.sub(fr'(\W|^){tag.label}(\W|$)', fr'\1({tag.definition})\2', self._query)
-            depth += 1
-            if depth >= self._MAXIMUM_DEPTH:
+        pattern, definitions, invalid_labels = self._get_compound_tags(db_version)
+
+        def replace(match: typ.Match) -> str:
+            if match[0] in invalid_labels:
+                raise RecursionError(self._MAXIMUM_DEPTH)
+            return f'({definitions[match[0]]})'
+
+        # Definitions are already fully expanded, a single scan is enough
+        if pattern:
+            try:
+                self._query = pattern.sub(replace, self._query)
+            except RecursionError:
                 self._error = _t('thread.search.error.max_recursion', max_depth=self._MAXIMUM_DEPTH)
                 return
 
@@ -665,6 +834,55 @@ class _SearchThread(QtC.QThread):
         for index, value in meta_tag_values.items():
             self._query = self._query.replace(f'%%{index}%%', value, 1)
 
+    @classmethod
+    def _get_compound_tags(cls, db_version: typ.Optional[typ.Tuple[int, int, int]]) \
+            -> typ.Tuple[typ.Optional[typ.Pattern], typ.Dict[str, str], typ.Set[str]]:
+        """Returns all compound tags with their definitions expanded so that they do not reference any other compound
+        tag. Tags are expanded depth-first from their dependencies; the result is cached until the database changes.
+        Tags that reference each other in a cycle or are nested too deeply cannot be expanded. They are returned
+        separately so that only queries that use them fail.
+
+        :param db_version: The database’s current data version or None if it could not be read.
+        :return: A pattern matching the label of any compound tag, or None if there are none, a dict associating
+            each valid compound tag’s label to its expanded definition and the labels of invalid compound tags.
+        """
+        with QtC.QMutexLocker(cls._cache_lock):
+            if db_version is not None and cls._compound_tags_cache[0] == db_version:
+                return cls._compound_tags_cache[1:]
+
+        tags_dao = da.TagsDao(config.CONFIG.database_path)
+        definitions = {tag.label: tag.definition for tag in tags_dao.get_all_tags(tag_class=model.CompoundTag)}
+        if not definitions:
+            pattern = None
+        else:
+            # Single alternation of all labels, longest first so that no label shadows another one
+            labels = sorted(definitions, key=len, reverse=True)
+            pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, labels)) + r')(?!\w)')
+        expanded = {}
+        invalid_labels = set()
+
+        def expand(label: str, path: typ.List[str]) -> str:
+            if label in expanded:
+                return expanded[label]
+            if label in invalid_labels or label in path or len(path) >= cls._MAXIMUM_DEPTH:
+                raise RecursionError(cls._MAXIMUM_DEPTH)
+            path.append(label)
+            try:
+                definition = pattern.sub(lambda m: f'({expand(m[0], path)})', definitions[label])
+            finally:
+                path.pop()
+            expanded[label] = definition
+            return definition
+
+        for label in definitions:
+            try:
+                expand(label, [])
+            except RecursionError:
+                invalid_labels.add(label)
+        with QtC.QMutexLocker(cls._cache_lock):
+            cls._compound_tags_cache = (db_version, pattern, expanded, invalid_labels)
+        return pattern, expanded, invalid_labels
+
     @property
     def fetched_images(self) -> typ.List[model.Image]:
         """Returns all fetched images."""
@@ -365,27 +365,30 @@ class TranslatedPlainTextEdit(QtW.QPlainTextEdit):
         menu.exec_(event.globalPos())
 
 
-class TranslatedTableWidget(QtW.QTableWidget):
-    """QTableWidget with translated cell context menu."""
+class TranslatedItemDelegate(QtW.QStyledItemDelegate):
+    """Item delegate whose line edit editors have a translated context menu."""
 
-    def __init__(self, parent: QtW.QWidget = None):
-        super().__init__(parent=parent)
-        self.setItemDelegate(self._StyledItemDelegate(parent=self))
+    def createEditor(self, parent, option, index):
+        editor = super().createEditor(parent, option, index)
+        if isinstance(editor, QtW.QLineEdit):
+            editor.setContextMenuPolicy(QtC.Qt.CustomContextMenu)
+            editor.customContextMenuRequested.connect(self.handle_context_menu)
+        return editor
+
+    def handle_context_menu(self, pos: QtC.QPoint):
+        editor = self.sender()
+        if isinstance(editor, QtW.QLineEdit):
+            menu = editor.createStandardContextMenu()
+            utils.gui.translate_text_widget_menu(menu)
+            menu.exec_(editor.mapToGlobal(pos))
 
-    class _StyledItemDelegate(QtW.QStyledItemDelegate):
-        def createEditor(self, parent, option, index):
-            editor = super().createEditor(parent, option, index)
-            if isinstance(editor, QtW.QLineEdit):
-                editor.setContextMenuPolicy(QtC.Qt.CustomContextMenu)
-                editor.customContextMenuRequested.connect(self.handle_context_menu)
-            return editor
 
-        def handle_context_menu(self, pos: QtC.QPoint):
-            editor = self.sender()
-            if isinstance(editor, QtW.QLineEdit):
-                menu = editor.createStandardContextMenu()
-                utils.gui.translate_text_widget_menu(menu)
-                menu.exec_(editor.mapToGlobal(pos))
+class TranslatedTableView(QtW.QTableView):
+    """QTableView with translated cell context menu."""
+
+    def __init__(self, parent: QtW.QWidget = None):
+        super().__init__(parent=parent)
+        self.setItemDelegate(TranslatedItemDelegate(parent=self))
 
 
 # Base code: https://blog.elentok.com/2011/08/autocomplete-textbox-for-multiple.html
@@ -399,12 +402,16 @@ class AutoCompleteLineEdit(TranslatedLineEdit):
         self._completer = QtW.QCompleter(parent=self)
         self._completer.setCaseSensitivity(QtC.Qt.CaseInsensitive)
         self._completer.setFilterMode(QtC.Qt.MatchStartsWith)
+        self._completer_model = QtC.QStringListModel(parent=self)
+        self._completer.setModel(self._completer_model)
+        # Values are kept sorted so that the completer can use binary search
+        self._completer.setModelSorting(QtW.QCompleter.CaseInsensitivelySortedModel)
         self._completer.setWidget(self)
         self._completer.activated.connect(self._insert_completion)
         self._keys_to_ignore = [QtC.Qt.Key_Enter, QtC.Qt.Key_Return]
 
     def set_completer_model(self, values: typ.Iterable[str]):
-        self._completer.setModel(QtC.QStringListModel(values, parent=self))
+        self._completer_model.setStringList(sorted(values, key=str.lower))
 
     def keyPressEvent(self, event: QtG.QKeyEvent):
         if self._completer.popup().isVisible() and event.key() in self._keys_to_ignore:
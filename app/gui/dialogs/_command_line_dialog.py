@@ -21,8 +21,8 @@ class CommandLineDialog(_dialog_base.Dialog):
             modal=True,
             mode=_dialog_base.Dialog.CLOSE
         )
-        # noinspection PyProtectedMember
-        self._connection = data_access.ImageDao(config.CONFIG.database_path)._connection
+        # Use a dedicated connection so that transactions started by the user do not affect the rest of the app
+        self._connection = data_access.dao.open_connection(config.CONFIG.database_path)
         self._command_line.setFocus()
         self._disable_closing = False
 
@@ -1,4 +1,6 @@
 import collections
+import errno
+import os
 import pathlib
 import re
 import shutil
@@ -46,6 +48,9 @@ class EditImageDialog(_dialog_base.Dialog):
 
         self._index = -1
         self._images: typ.List[model.Image] = []
+        self._current_image: typ.Optional[model.Image] = None
+        # Path of the image currently shown by the canvas
+        self._canvas_image_path: typ.Optional[pathlib.Path] = None
         self._tags: typ.Dict[int, typ.List[model.Tag]] = {}
 
         self._image_dao = image_dao
@@ -58,6 +63,8 @@ class EditImageDialog(_dialog_base.Dialog):
         self._destination: typ.Optional[pathlib.Path] = None
         self._image_to_replace: typ.Optional[pathlib.Path] = None
         self._tags_changed = False
+        # Parsed content of the tags input, reset whenever its text changes
+        self._cached_tags: typ.Optional[typ.List[model.Tag]] = None
         self._similar_images: typ.List[typ.Tuple[model.Image, float]] = []
 
         self._tags_dialog = None
@@ -167,7 +174,7 @@ class EditImageDialog(_dialog_base.Dialog):
 
     def _open_image_directory(self):
         """Shows the current image in the system’s file explorer."""
-        utils.gui.show_file(self._images[self._index].path)
+        utils.gui.show_file(self._current_image.path)
 
     def set_images(self, images: typ.List[model.Image], tags: typ.Dict[int, typ.List[model.Tag]]):
         """Sets the images to display. If more than one image are given, they will be displayed one after another when
@@ -193,14 +200,14 @@ class EditImageDialog(_dialog_base.Dialog):
         """Sets the current image."""
         # Update completer
         if self._tags_changed or index == 0:
-            self._tags_input.set_completer_model(
-                [t.label for t in self._tags_dao.get_all_tags(tag_class=model.Tag, sort_by_label=True)])
+            self._tags_input.set_completer_model(self._tags_dao.get_all_tag_labels(tag_class=model.Tag))
 
         image = self._images[index]
         # Calculate hash if in add mode
         if self._mode == EditImageDialog.ADD:
             hash_ = utils.image.get_hash(image.path)
             self._images[index] = image = model.Image(id=image.id, path=image.path, hash=hash_)
+        self._current_image = image
 
         self._image_path_lbl.setText(str(image.path))
         self._image_path_lbl.setToolTip(str(image.path))
@@ -208,15 +215,14 @@ class EditImageDialog(_dialog_base.Dialog):
         if self._mode == EditImageDialog.REPLACE:
             self._tags_input.setDisabled(False)
         if self._mode != EditImageDialog.ADD:
-            tags = []
-            if image.id in self._tags:
-                tags = self._tags[image.id]
-            self._set_tags(tags, clear_undo_redo=True)
+            self._set_tags(self._tags.get(image.id, ()), clear_undo_redo=True)
         if self._mode == EditImageDialog.REPLACE:
             self._tags_input.setDisabled(True)
         self._tags_changed = False
 
-        self._canvas.set_image(image.path)
+        if image.path != self._canvas_image_path:
+            self._canvas.set_image(image.path)
+            self._canvas_image_path = image.path
 
         similar_images = self._image_dao.get_similar_images(image.path) or []
         self._similar_images = [(image, score) for image, _, score, same_path in similar_images if not same_path]
@@ -234,9 +240,12 @@ class EditImageDialog(_dialog_base.Dialog):
 
         self.setWindowTitle(self._get_title())
 
-    def _set_tags(self, tags: typ.List[model.Tag], clear_undo_redo: bool = True):
-        self._tags_input.clear()
-        self._tags_input.insertPlainText(' '.join(sorted([tag.raw_label() for tag in tags])))
+    def _set_tags(self, tags: typ.Iterable[model.Tag], clear_undo_redo: bool = True):
+        # Clearing then inserting would emit textChanged twice, notify only once
+        with QtC.QSignalBlocker(self._tags_input):
+            self._tags_input.clear()
+            self._tags_input.insertPlainText(' '.join(sorted(tag.raw_label() for tag in tags)))
+        self._text_changed()
         if clear_undo_redo:
             self._tags_input.document().clearUndoRedoStacks()
 
@@ -265,7 +274,7 @@ class EditImageDialog(_dialog_base.Dialog):
             config.CONFIG.last_directory = destination
         if destination:
             if self._mode == EditImageDialog.REPLACE:
-                img = self._images[0]
+                img = self._current_image
                 if self._image_to_replace is None:
                     self._image_to_replace = img.path
                 if self._image_to_replace == destination:
@@ -283,16 +292,20 @@ class EditImageDialog(_dialog_base.Dialog):
 
     def _text_changed(self):
         self._tags_changed = True
+        self._cached_tags = None
 
     def _get_tags(self) -> typ.List[model.Tag]:
-        return [self._tags_dao.create_tag_from_string(t) for t in self._tags_input.toPlainText().split()]
+        if self._cached_tags is None:
+            self._cached_tags = self._tags_dao.create_tags_from_strings(self._tags_input.toPlainText().split())
+        return self._cached_tags
 
     @staticmethod
     def _get_duplicate_tags(tags: typ.List[model.Tag]) -> typ.List[str]:
         return [t for t, c in collections.Counter([t.label for t in tags]).items() if c > 1]
 
     def _get_compound_tags(self, tags: typ.List[model.Tag]) -> typ.List[str]:
-        return [t.label for t in tags if self._tags_dao.get_tag_class(t.label) == model.CompoundTag]
+        classes = self._tags_dao.get_tag_classes(t.label for t in tags) or {}
+        return [t.label for t in tags if classes.get(t.label) == model.CompoundTag]
 
     def _get_error(self) -> typ.Optional[str]:
         try:
@@ -303,7 +316,9 @@ class EditImageDialog(_dialog_base.Dialog):
         else:
             if len(tags) == 0:
                 return _t('dialog.edit_image.error.no_tags')
-            elif t := self._get_compound_tags(tags):
+            # Untouched tags were loaded from the database, they cannot be compound
+            elif self._mode != EditImageDialog.REPLACE and self._tags_changed \
+                    and (t := self._get_compound_tags(tags)):
                 return _t('dialog.edit_image.error.compound_tags_disallowed', tags='\n'.join(t))
             elif t := self._get_duplicate_tags(tags):
                 return _t('dialog.edit_image.error.duplicate_tags', tags='\n'.join(t))
@@ -316,7 +331,7 @@ class EditImageDialog(_dialog_base.Dialog):
     def _apply(self) -> bool:
         tags = self._get_tags()
 
-        image = self._images[self._index]
+        image = self._current_image
         new_path = self._get_new_path(image)
 
         if self._mode == EditImageDialog.ADD:
@@ -382,11 +397,9 @@ class EditImageDialog(_dialog_base.Dialog):
             ok, error = True, None
             if new_path:
                 ok, error = self._move_image(image.path, new_path)
-            if ok:
-                if self._tags_changed:
-                    ok = self._image_dao.update_image_tags(image.id, tags)
-                if ok and new_path:
-                    ok = self._image_dao.update_image(image.id, new_path, image.hash)
+            if ok and (self._tags_changed or new_path):
+                ok = self._image_dao.update_image_and_tags(image.id, tags if self._tags_changed else None, new_path,
+                                                           image.hash)
             return ok, error or _t('dialog.edit_image.error.changes_not_applied')
         else:
             return False, _t('dialog.edit_image.error.file_does_not_exists')
@@ -401,7 +414,7 @@ class EditImageDialog(_dialog_base.Dialog):
                 self._image_to_replace.unlink()
             except OSError:
                 pass
-            image = self._images[0]
+            image = self._current_image
             new_hash = utils.image.get_hash(image.path)
             return self._image_dao.update_image(image.id, self._destination, new_hash), _t('dialog.edit_image.error.')
         else:
@@ -416,11 +429,23 @@ class EditImageDialog(_dialog_base.Dialog):
         :return: True if the image was moved.
         """
         if new_path.exists():
+            try:
+                # Destination may be the source itself through a different path (symlink, case, etc.)
+                if path.samefile(new_path):
+                    return True, None
+            except OSError:
+                pass
             return False, _t('dialog.edit_image.error.file_already_exists')
         if not path.exists():
             return False, _t('dialog.edit_image.error.file_does_not_exist')
         try:
-            shutil.move(path, new_path)
+            try:
+                # A plain rename is enough if both paths are on the same file system
+                os.replace(path, new_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(path, new_path)
         except OSError:
             return False, _t('dialog.edit_image.error.failed_to_move_file')
         else:
@@ -447,12 +472,16 @@ class _CustomTextEdit(components.TranslatedPlainTextEdit):
         self._completer = QtW.QCompleter(parent=self)
         self._completer.setCaseSensitivity(QtC.Qt.CaseInsensitive)
         self._completer.setFilterMode(QtC.Qt.MatchStartsWith)
+        self._completer_model = QtC.QStringListModel(parent=self)
+        self._completer.setModel(self._completer_model)
+        # Values are kept sorted so that the completer can use binary search
+        self._completer.setModelSorting(QtW.QCompleter.CaseInsensitivelySortedModel)
         self._completer.setWidget(self)
         self._completer.activated.connect(self._insert_completion)
         self._keys_to_ignore = [QtC.Qt.Key_Enter, QtC.Qt.Key_Return]
 
     def set_completer_model(self, values: typ.Iterable[str]):
-        self._completer.setModel(QtC.QStringListModel(values, parent=self))
+        self._completer_model.setStringList(sorted(values, key=str.lower))
 
     def keyPressEvent(self, event: QtG.QKeyEvent):
         # noinspection PyTypeChecker
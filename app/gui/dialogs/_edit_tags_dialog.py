@@ -1,3 +1,4 @@
+import functools
 import typing as typ
 
 import PyQt5.QtCore as QtC
@@ -15,6 +16,10 @@ class EditTagsDialog(_dialog_base.Dialog):
     _TAG_TYPES_TAB = 0
     _COMPOUND_TAGS_TAB = 1
     _TAGS_TAB = 2
+    # Delay in milliseconds after the last keystroke before searching
+    _SEARCH_DELAY = 250
+    # Minimum length of the text to search as the user types
+    _SEARCH_AS_TYPED_MIN_LENGTH = 2
 
     def __init__(self, tags_dao: data_access.TagsDao, editable: bool = True, parent: typ.Optional[QtW.QWidget] = None):
         """Creates a dialog.
@@ -28,24 +33,40 @@ class EditTagsDialog(_dialog_base.Dialog):
 
         def type_cell_changed(row: int, col: int, _):
             if col == 1:
-                for tab in self._tabs[1:]:
-                    tag_type = self._tabs[self._TAG_TYPES_TAB].get_value(row)
-                    if tag_type is not None:
+                tag_type = self._tabs[self._TAG_TYPES_TAB].get_value(row)
+                if tag_type is not None:
+                    self._type_label_by_id[tag_type.id] = tag_type.label
+                    for tab in self._tabs[1:]:
                         tab.update_type_label(tag_type)
-            self._check_integrity()
+            self._check_integrity(self._TAG_TYPES_TAB)
 
         def types_deleted(deleted_types: typ.List[model.TagType]):
+            deleted_ids = {tag_type.id for tag_type in deleted_types if tag_type is not None}
+            for ident in deleted_ids:
+                self._type_label_by_id.pop(ident, None)
+            self._tag_types[:] = [tag_type for tag_type in self._tag_types if tag_type.id not in deleted_ids]
             for tab in self._tabs[1:]:
                 tab.delete_types(deleted_types)
 
+        # Saved tag types, loaded once by the types tab and shared with tags tabs
+        self._tag_types: typ.List[model.TagType] = []
+        # Labels of tag types displayed in tags tabs, by type ID
+        self._type_label_by_id: typ.Dict[int, str] = {}
         self._tabs = (
             _tabs.TagTypesTab(self, tags_dao, self._editable, selection_changed=self._selection_changed,
                               cell_changed=type_cell_changed, rows_deleted=types_deleted),
-            _tabs.CompoundTagsTab(self, tags_dao, self._editable, selection_changed=self._selection_changed,
-                                  cell_changed=self._check_integrity, rows_deleted=self._check_integrity),
-            _tabs.TagsTab(self, tags_dao, self._editable, selection_changed=self._selection_changed,
-                          cell_changed=self._check_integrity, rows_deleted=self._check_integrity)
+            _tabs.CompoundTagsTab(self, tags_dao, self._editable, self._tag_types,
+                                  self._type_label_by_id, selection_changed=self._selection_changed,
+                                  cell_changed=functools.partial(self._check_integrity, self._COMPOUND_TAGS_TAB),
+                                  rows_deleted=functools.partial(self._check_integrity, self._COMPOUND_TAGS_TAB)),
+            _tabs.TagsTab(self, tags_dao, self._editable, self._tag_types, self._type_label_by_id,
+                          selection_changed=self._selection_changed,
+                          cell_changed=functools.partial(self._check_integrity, self._TAGS_TAB),
+                          rows_deleted=functools.partial(self._check_integrity, self._TAGS_TAB))
         )
+        # Validity and number of modified rows of each tab, as of their last check
+        self._tabs_valid = [True] * len(self._tabs)
+        self._tabs_modified_rows = [0] * len(self._tabs)
 
         title = _t('dialog.edit_tags.title_edit') if self._editable else _t('dialog.edit_tags.title_readonly')
         mode = self.CLOSE if not self._editable else self.OK_CANCEL
@@ -91,15 +112,21 @@ class EditTagsDialog(_dialog_base.Dialog):
         self._search_field = _InputField(parent=self)
         self._search_field.setPlaceholderText(_t('dialog.edit_tags.search_field.placeholder'))
         self._search_field.returnPressed.connect(self._search)
-        self._search_field.textChanged.connect(self._reset_status_label)
+        self._search_field.textChanged.connect(self._search_text_changed)
         search_layout.addWidget(self._search_field)
 
+        # Search as the user types, once they pause
+        self._search_timer = QtC.QTimer(parent=self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self._SEARCH_DELAY)
+        self._search_timer.timeout.connect(self._search_as_typed)
+
         search_btn = QtW.QPushButton(
             utils.gui.icon('search'),
             _t('dialog.edit_tags.search_button.label'),
             parent=self
         )
-        search_btn.clicked.connect(self._search)
+        search_btn.clicked.connect(lambda: self._search())
         search_layout.addWidget(search_btn)
 
         layout.addLayout(search_layout)
@@ -113,7 +140,15 @@ class EditTagsDialog(_dialog_base.Dialog):
         if self._editable:
             def apply():
                 self._apply()
-                self._init_tabs()
+                for i, tab in enumerate(self._tabs):
+                    if tab.loaded:
+                        tab.refresh_dirty()
+                    else:
+                        tab.discard_prefetched()
+                    if i == self._TAG_TYPES_TAB:
+                        # Tags tabs compare their rows against the refreshed types
+                        self._update_types()
+                self._check_integrity()
 
             self._ok_btn.setEnabled(False)
             self._apply_btn = QtW.QPushButton(
@@ -128,23 +163,56 @@ class EditTagsDialog(_dialog_base.Dialog):
             return []
 
     def _init_tabs(self):
-        self._tabbed_pane.clear()
+        self._tabbed_pane.setUpdatesEnabled(False)
+        try:
+            # Buttons are updated once all tabs have been added
+            with QtC.QSignalBlocker(self._tabbed_pane):
+                self._tabbed_pane.clear()
+                for tab in self._tabs:
+                    tab.init()
+                    self._tabbed_pane.addTab(tab.table, tab.title)
+            # Types are always needed to display tags, other tabs are loaded when first shown
+            self._tabs[self._TAG_TYPES_TAB].load()
+            self._update_types()
+            current_tab = self._tabs[self._tabbed_pane.currentIndex()]
+            if not current_tab.loaded:
+                current_tab.load()
+        finally:
+            self._tabbed_pane.setUpdatesEnabled(True)
+        # Fetch the rows of the other tabs in the background in the meantime
         for tab in self._tabs:
-            tab.init()
-            self._tabbed_pane.addTab(tab.table, tab.title)
+            if not tab.loaded:
+                QtC.QThreadPool.globalInstance().start(QtC.QRunnable.create(tab.prefetch))
+        # Freshly loaded tabs are valid and unmodified, no need to check them
+        self._tabs_valid = [True] * len(self._tabs)
+        self._tabs_modified_rows = [0] * len(self._tabs)
+        self._tab_changed(self._tabbed_pane.currentIndex())
+
+    def _update_types(self):
+        """Reads the saved tag types and the labels of all tag types from the types tab."""
+        self._tag_types[:] = self._tabs[self._TAG_TYPES_TAB].saved_types
+        self._type_label_by_id.clear()
+        self._type_label_by_id.update(self._tabs[self._TAG_TYPES_TAB].get_labels())
 
     def _add_row(self):
-        self._tabs[self._tabbed_pane.currentIndex()].add_row()
-        self._check_integrity()
+        index = self._tabbed_pane.currentIndex()
+        self._tabs[index].add_row()
+        self._check_integrity(index)
 
     def _delete_selected_row(self):
-        self._tabs[self._tabbed_pane.currentIndex()].delete_selected_rows()
-        self._check_integrity()
+        index = self._tabbed_pane.currentIndex()
+        self._tabs[index].delete_selected_rows()
+        self._check_integrity(index)
+        self._update_delete_row_btn(index)
 
+    @QtC.pyqtSlot(int)
     def _tab_changed(self, index: int):
+        if not self._tabs[index].loaded:
+            self._tabs[index].load()
         self._add_row_btn.setEnabled(self._tabs[index].addable)
         self._update_delete_row_btn(index)
 
+    @QtC.pyqtSlot()
     def _selection_changed(self):
         self._update_delete_row_btn(self._tabbed_pane.currentIndex())
 
@@ -156,14 +224,31 @@ class EditTagsDialog(_dialog_base.Dialog):
         self._status_label.setText('')
         self._status_label.setIcon(None)
 
-    def _search(self):
+    @QtC.pyqtSlot()
+    def _search_text_changed(self):
+        self._reset_status_label()
+        self._search_timer.start()
+
+    @QtC.pyqtSlot()
+    def _search_as_typed(self):
+        # Single characters match too many rows to be worth scanning, unless the user explicitly asks for it
+        if len(self._search_field.text().strip()) >= self._SEARCH_AS_TYPED_MIN_LENGTH:
+            self._search(from_start=True)
+
+    def _search(self, from_start: bool = False):
+        """Searches the typed text in the current tab.
+
+        :param from_start: If true the search starts from the first row instead of the one after the selection.
+        """
+        self._search_timer.stop()
         text = self._search_field.text().strip()
         if len(text) > 0:
-            found = self._tabs[self._tabbed_pane.currentIndex()].search(text)
-            if found is None:
+            # The query has already been validated by the field
+            pattern = self._search_field.pattern
+            if pattern is None:
                 self._status_label.setText(_t('dialog.edit_tags.syntax_error'))
                 self._status_label.setIcon(utils.gui.icon('warning'))
-            elif not found:
+            elif not self._tabs[self._tabbed_pane.currentIndex()].search(pattern, from_start=from_start):
                 self._status_label.setText(_t('dialog.edit_tags.no_match'))
                 self._status_label.setIcon(utils.gui.icon('help-about'))
             else:
@@ -174,7 +259,9 @@ class EditTagsDialog(_dialog_base.Dialog):
         return self._valid
 
     def _apply(self) -> bool:
-        ok = all(map(lambda t: t.apply(), self._tabs))
+        ok = True
+        for tab in self._tabs:
+            ok &= tab.apply()
         if not ok:
             utils.gui.show_error(_t('dialog.edit_tags.error.saving'), parent=self)
         else:
@@ -183,17 +270,40 @@ class EditTagsDialog(_dialog_base.Dialog):
 
         return True
 
-    def _check_integrity(self, *_):
-        """Checks the integrity of all tables. Parameters are ignored, they are here only to conform to the Tab class
-        constructor.
+    def _check_integrity(self, index: typ.Optional[int] = None, *_):
+        """Checks the integrity of the given table, the other ones keeping their last known state. Other parameters
+        are ignored, they are here only to conform to the Tab class constructor.
+
+        :param index: Index of the tab to check. If None, all tabs are checked.
         """
-        self._valid = all(map(lambda t: t.check_integrity(), self._tabs))
-        edited_rows_nb = sum(map(lambda t: t.modified_rows_number, self._tabs))
+        for i in (range(len(self._tabs)) if index is None else [index]):
+            self._tabs_valid[i] = self._tabs[i].check_integrity()
+            self._tabs_modified_rows[i] = self._tabs[i].modified_rows_number
+        self._valid = all(self._tabs_valid)
+        edited_rows_nb = sum(self._tabs_modified_rows)
         self._apply_btn.setEnabled(edited_rows_nb > 0 and self._valid)
         self._ok_btn.setEnabled(self._valid)
 
 
 class _InputField(components.TranslatedLineEdit):
+    """Search field that validates the query as it is typed and outlines it in red if it is invalid."""
+
+    def __init__(self, parent: QtW.QWidget = None):
+        super().__init__(parent=parent)
+        self._pattern = None
+        self.textChanged.connect(self._validate)
+
+    @property
+    def pattern(self) -> typ.Optional[typ.Pattern]:
+        """Returns the pattern for the current query or None if it is empty or invalid."""
+        return self._pattern
+
+    @QtC.pyqtSlot(str)
+    def _validate(self, text: str):
+        query = text.strip()
+        self._pattern = _tabs.compile_search_pattern(query) if query else None
+        self.setStyleSheet('border: 1px solid red' if query and self._pattern is None else '')
+
     def keyPressEvent(self, event: QtG.QKeyEvent):
         # Prevent event from propagating to the search button
         if event.key() in [QtC.Qt.Key_Return, QtC.Qt.Key_Enter]:
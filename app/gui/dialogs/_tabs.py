@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import abc
+import array
+import collections
+import functools
 import re
+import threading
 import typing as typ
 
 import PyQt5.QtCore as QtC
@@ -15,16 +19,66 @@ from .. import components
 _Type = typ.TypeVar('_Type')
 
 
+# Escapes regex meta-characters except * and ?
+_ESCAPE_TABLE = str.maketrans({c: '\\' + c for c in '[]()+{.^$'})
+
+
+@functools.lru_cache(maxsize=256)
+def compile_search_pattern(query: str) -> typ.Optional[typ.Pattern]:
+    """Converts a search query into a case-insensitive pattern. Queries may contain '*' and '?' wildcards, which can be
+    escaped with a '\\'.
+
+    :param query: The query.
+    :return: The compiled pattern or None if the query has a syntax error.
+    """
+    # Check for any invalid \
+    if re.search(r'((?<!\\)\\(?:\\\\)*)([^*?\\]|$)', query):
+        return None
+
+    # Merge consecutive non-escaped '*' as each one would add a level of backtracking
+    query = re.sub(r'((?<!\\)(?:\\\\)*)\*{2,}', r'\1*', query)
+    pattern = query.translate(_ESCAPE_TABLE)
+    # Replace non-escaped '*' and '?' by a regex
+    pattern = re.sub(r'((?<!\\)(?:\\\\)*)([*?])', r'\1.\2', pattern)
+    return re.compile(f'^{pattern}$', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=256)
+def _get_definition_error(definition: str) -> str:
+    """Parses a compound tag definition. Results are cached as definitions are re-checked on each edit and apply.
+
+    :param definition: The definition to parse.
+    :return: The syntax error message or an empty string if the definition is valid.
+    """
+    try:
+        queries.query_to_sympy(definition, simplify=False)
+    except ValueError as e:
+        return str(e)
+    return ''
+
+
 class Tab(abc.ABC, typ.Generic[_Type]):
     """This class represents a tab containing a single table.
     This is a generic class. _Type is the type of the values displayed in each row.
+
+    Rows are held by a TagsModel and displayed through a proxy that sorts them and hides deleted ones. Unless stated
+    otherwise, row indices are those of the model, which do not change when the table is sorted.
     """
     _OK = 0
     _DUPLICATE = 1
     _EMPTY = 2
     _FORMAT = 4
 
-    def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, title: str, addable: bool, deletable: bool, editable: bool,
+    # Whether rows can be added to/deleted from tabs of this class
+    _ADDABLE = True
+    _DELETABLE = True
+    # Pattern that cells must match and translation key of the error message, for each column
+    _FORMAT_PATTERNS: typ.Dict[int, typ.Tuple[typ.Pattern, str]] = {}
+
+    # Maximum number of queries whose matching rows are remembered
+    _SEARCH_CACHE_SIZE = 32
+
+    def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, title: str, editable: bool,
                  columns_to_check: typ.List[typ.Tuple[int, bool]], search_columns: typ.List[int],
                  selection_changed: typ.Optional[typ.Callable[[None], None]] = None,
                  cell_changed: typ.Optional[typ.Callable[[int, int, str], None]] = None,
@@ -33,8 +87,6 @@ class Tab(abc.ABC, typ.Generic[_Type]):
 
         :param owner: Tab’s owner.
         :param dao: The tag’s DAO.
-        :param addable: If true rows can be added to this tab.
-        :param deletable: If true rows can be deleted from this tab.
         :param editable: If true the contained table will be editable.
         :param columns_to_check: List of column indices that need content checking.
         :param search_columns: List of column indices in which searching is allowed.
@@ -43,11 +95,10 @@ class Tab(abc.ABC, typ.Generic[_Type]):
         :param rows_deleted: Action called when rows have been deleted. It takes the list of deleted values.
         """
         self._initialized = False
+        self._loaded = False
         self._owner = owner
         self._tags_dao = dao
         self._title = title
-        self._addable = addable
-        self._deletable = deletable
         self._editable = editable
         self._columns_to_check: typ.Dict[int, bool] = {c: b for c, b in columns_to_check}
         self._search_columns = search_columns
@@ -56,35 +107,78 @@ class Tab(abc.ABC, typ.Generic[_Type]):
         self._rows_deleted = rows_deleted
 
         # noinspection PyTypeChecker
-        self._table: QtW.QTableWidget = None
+        self._table: QtW.QTableView = None
+        # noinspection PyTypeChecker
+        self._model: TagsModel = None
+        # noinspection PyTypeChecker
+        self._proxy: _TabProxyModel = None
 
-        self._values = []
+        # Values as of the last load or apply, with their use count, for each row
+        self._values: typ.Dict[int, typ.Tuple[_Type, int]] = {}
+        # Cells of each row as of the last load or apply, and columns whose cell differs from them
+        self._saved_cells: typ.Dict[int, typ.Tuple[typ.Any, ...]] = {}
+        self._modified_cells: typ.Dict[int, typ.Set[int]] = {}
         self._changed_rows = set()
         self._added_rows = set()
         self._deleted_rows = set()
+        # Added and changed rows that have been saved by the last call to apply()
+        self._applied_rows = set()
 
         self._dummy_type_id = -1
+        # Kept up to date by _update_selected_rows_number()
+        self._selected_rows_number = 0
+
+        # Rows matching the most recent queries and rows starting with a match, for each search column
+        self._search_cache: typ.Dict[str, typ.Tuple[typ.Dict[int, typ.List[int]], typ.Dict[int, typ.List[int]]]] = {}
+        # Rows containing each case-folded trigram, for each search column; built on the first search
+        self._trigram_index: typ.Optional[typ.Dict[int, typ.Dict[str, array.array]]] = None
+
+        # Rows holding each value, for each checked column; built on the first cell check.
+        # Rows are never removed from it, so they must be checked against the model.
+        self._rows_by_value: typ.Dict[int, typ.Dict[str, typ.Set[int]]] = {}
 
         self._valid = True
 
+        # Data fetched ahead of loading by prefetch()
+        self._prefetched = None
+        self._prefetch_lock = threading.Lock()
+
         # Use system colors
         self._DISABLED_COLOR = QtW.QApplication.palette().color(QtG.QPalette.Disabled, QtG.QPalette.Base)
 
-    @abc.abstractmethod
     def init(self):
-        """Initializes the inner table."""
+        """Initializes the inner table. Rows are not loaded until load() is called."""
         if self._table:
             self._initialized = False
+            self._loaded = False
             self._table.destroy()
 
-        self._table = components.TranslatedTableWidget(parent=self._owner)
+        self._table = components.TranslatedTableView(parent=self._owner)
+        self._table.setItemDelegate(_SpeedUpDelegate(parent=self._table))
+        headers = self._get_headers()
+        # IDs and use counts are stored in integer arrays
+        typecodes = ['q', *[None] * (len(headers) - 2), 'q']
+        self._model = TagsModel(self, headers, typecodes, parent=self._table)
+        self._model.dataChanged.connect(self._data_changed)
+        self._model.rowsInserted.connect(self._invalidate_search_cache)
+        self._model.rowsInserted.connect(self._clear_rows_by_value)
+        self._model.modelReset.connect(self._clear_rows_by_value)
+        self._proxy = _TabProxyModel(parent=self._table)
+        self._proxy.setSourceModel(self._model)
+        self._table.setModel(self._proxy)
         self._table.setSelectionBehavior(QtW.QAbstractItemView.SelectRows)
         self._table.verticalHeader().setDefaultSectionSize(20)
         self._table.horizontalHeader().setStretchLastSection(True)
-        self._table.setSortingEnabled(True)
-        self._table.cellChanged.connect(self._cell_edited)
+        self._table.setColumnWidth(0, 30)
+        self._invalidate_search_cache()
+        self._selected_rows_number = 0
+        # Selected rows may also be removed when rows are hidden or the model is reset
+        self._table.selectionModel().selectionChanged.connect(self._update_selected_rows_number,
+                                                              QtC.Qt.DirectConnection)
+        self._proxy.rowsRemoved.connect(self._update_selected_rows_number)
+        self._proxy.modelReset.connect(self._update_selected_rows_number)
         if self._selection_changed is not None:
-            self._table.itemSelectionChanged.connect(self._selection_changed)
+            self._table.selectionModel().selectionChanged.connect(self._selection_changed, QtC.Qt.DirectConnection)
         if not self._editable:
             self._table.setSelectionMode(QtW.QAbstractItemView.SingleSelection)
         else:
@@ -93,8 +187,46 @@ class Tab(abc.ABC, typ.Generic[_Type]):
             delete_action.triggered.connect(self.delete_selected_rows)
             self._table.addAction(delete_action)
 
+    def load(self):
+        """Loads all rows into the inner table, using prefetched data if available."""
+        with self._prefetch_lock:
+            data, self._prefetched = self._prefetched, None
+        if data is None:
+            data = self._fetch_rows()
+
+        # Do not repaint nor sort the table while rows are loaded, and do not report selection resets
+        self._table.setUpdatesEnabled(False)
+        try:
+            with QtC.QSignalBlocker(self._table), QtC.QSignalBlocker(self._table.selectionModel()):
+                self._load_rows(data)
+        finally:
+            # Keep the model’s order until the user clicks on a header
+            self._table.horizontalHeader().setSortIndicator(-1, QtC.Qt.AscendingOrder)
+            self._table.setSortingEnabled(True)
+            self._table.setUpdatesEnabled(True)
+        self._loaded = True
+        self._initialized = True
+
+    def prefetch(self):
+        """Fetches the rows from the database so that they are ready when load() is called.
+        This method may be called from any thread.
+        """
+        with self._prefetch_lock:
+            if self._prefetched is None and not self._loaded:
+                self._prefetched = self._fetch_rows()
+
+    def discard_prefetched(self):
+        """Forgets prefetched rows. Must be called whenever the database is modified."""
+        with self._prefetch_lock:
+            self._prefetched = None
+
+    @property
+    def loaded(self) -> bool:
+        """Indicates whether the rows of this tab have been loaded."""
+        return self._loaded
+
     @property
-    def table(self) -> QtW.QTableWidget:
+    def table(self) -> QtW.QTableView:
         """Returns the inner table."""
         return self._table
 
@@ -104,16 +236,19 @@ class Tab(abc.ABC, typ.Generic[_Type]):
 
     @property
     def addable(self) -> bool:
-        return self._addable
+        return self._ADDABLE
 
     @property
     def deletable(self) -> bool:
-        return self._deletable
+        return self._DELETABLE
 
     @property
     def selected_rows_number(self) -> int:
         """Returns the number of selected rows."""
-        return len(self._table.selectionModel().selectedRows())
+        return self._selected_rows_number
+
+    def _update_selected_rows_number(self, *_):
+        self._selected_rows_number = len(self._table.selectionModel().selectedRows())
 
     @property
     def modified_rows_number(self) -> int:
@@ -122,70 +257,187 @@ class Tab(abc.ABC, typ.Generic[_Type]):
 
     def add_row(self):
         """Adds an empty row in the table."""
-        row = self._table.rowCount()
-        self._table.insertRow(row)
-        self._initialized = False
-        self._set_row(None, row)
+        row = self._model.rowCount()
+        self._model.append_row(self._make_row(None))
         self._added_rows.add(row)
-        self._initialized = True
         self._dummy_type_id -= 1
 
     def delete_selected_rows(self):
         """Deletes all selected rows."""
-        selected_rows = {i.row() for i in self._table.selectionModel().selectedRows()}
+        selected_rows = set()
+        # Iterate over ranges of model rows rather than over every selected index
+        for selection_range in self._proxy.mapSelectionToSource(self._table.selectionModel().selection()):
+            selected_rows.update(range(selection_range.top(), selection_range.bottom() + 1))
         if len(selected_rows) > 0:
             if utils.gui.show_question(_t('dialog.edit_tags.delete_warning.text'), parent=self._owner):
                 self._deleted_rows |= selected_rows - self._added_rows
                 self._changed_rows -= selected_rows
                 self._added_rows -= selected_rows
-                to_delete = []
-                for row in selected_rows:
-                    to_delete.append(self.get_value(row))
-                    self._table.setRowHidden(row, True)
+                to_delete = [self.get_value(row) for row in selected_rows]
+                self._proxy.hide_rows(selected_rows)
                 if self._rows_deleted is not None:
                     self._rows_deleted(to_delete)
 
-    def search(self, query: str) -> typ.Optional[bool]:
-        """Searches for a string inside the table.
-        Starts the search from the currently selected row, or from the first one if none is selected.
+    def search(self, pattern: typ.Pattern, from_start: bool = False) -> bool:
+        """Searches for a pattern inside the table.
+        Starts the search from the row after the currently selected one, or from the first one if none is selected.
 
-        :param query: The string pattern to search for.
-        :return: True if a match was found; False if none; None if the query has a syntax error.
+        :param pattern: The pattern to search for, as returned by compile_search_pattern.
+        :param from_start: If true the search starts from the first row regardless of the selection.
+        :return: True if a match was found; False if none.
         """
-        if selected_rows := self._table.selectionModel().selectedIndexes():
+        selection_model = self._table.selectionModel()
+        if from_start:
+            start_row = 0
+        elif selected_rows := selection_model.selectedIndexes():
             start_row = selected_rows[0].row() + 1
         else:
             start_row = 0
 
-        for item in self._table.selectedItems():
-            item.setSelected(False)
+        selection_model.clearSelection()
 
-        # Check for any invalid \
-        if re.search(r'((?<!\\)\\(?:\\\\)*)([^*?\\]|$)', query):
+        query = pattern.pattern
+        if query in self._search_cache:
+            matches = self._search_cache[query][0]
+        else:
+            matches, prefix_matches = {}, {}
+            candidates = self._get_prefix_matches(query)
+            # Rows that fully match also start with a match
+            prefix_match, fullmatch = re.compile(query[:-1], pattern.flags).match, pattern.fullmatch
+            for col in self._search_columns:
+                texts = self._model.columns[col]
+                rows = candidates[col] if candidates is not None else self._candidate_rows(pattern, col)
+                prefix_matches[col] = [row for row in rows if prefix_match(texts[row])]
+                matches[col] = [row for row in prefix_matches[col] if fullmatch(texts[row])]
+            if len(self._search_cache) >= self._SEARCH_CACHE_SIZE:
+                del self._search_cache[next(iter(self._search_cache))]
+            self._search_cache[query] = matches, prefix_matches
+
+        map_from_source, model_index = self._proxy.mapFromSource, self._model.index
+        for col in self._search_columns:
+            # Matches are in model order, look for the first one displayed after the start row
+            index = None
+            rows = [row for row in matches[col] if not self._proxy.is_row_hidden(row)]
+            if self._proxy.sortColumn() < 0:
+                # Rows are displayed in model order, the first match after the start row can be bisected
+                low, high = 0, len(rows)
+                while low < high:
+                    middle = (low + high) // 2
+                    if map_from_source(model_index(rows[middle], col)).row() < start_row:
+                        low = middle + 1
+                    else:
+                        high = middle
+                if low < len(rows):
+                    index = map_from_source(model_index(rows[low], col))
+            else:
+                for row in rows:
+                    index_ = map_from_source(model_index(row, col))
+                    if index_.row() >= start_row and (index is None or index_.row() < index.row()):
+                        index = index_
+            if index is not None:
+                self._table.setFocus()
+                self._table.scrollTo(index)
+                selection_model.select(index, QtC.QItemSelectionModel.Select)
+                return True
+
+        return False
+
+    def _get_prefix_matches(self, query: str) -> typ.Optional[typ.Dict[int, typ.List[int]]]:
+        """Returns the rows that start with a match of the longest cached query the given one extends.
+        Queries are translated to patterns character by character, so a query that extends another one only fully
+        matches texts that start with a match of the shorter one, e.g. 'a*c' only matches texts starting with 'a*'.
+
+        :param query: The new query’s pattern, as returned by compile_search_pattern.
+        :return: The rows for each search column or None if no cached query is extended by the given one.
+        """
+        # Patterns are wrapped in '^' and '$'
+        prefixes = [cached for cached in self._search_cache if query.startswith(cached[:-1])]
+        if not prefixes:
             return None
+        return self._search_cache[max(prefixes, key=len)][1]
 
-        # Escape regex meta-characters except * and ?
-        pattern = re.sub(r'([\[\]()+{.^$])', r'\\\1', query)
-        # Replace non-escaped '*' and '?' by a regex
-        pattern = re.sub(r'((?<!\\)(?:\\\\)*)([*?])', r'\1.\2', pattern)
-        pattern = f'^{pattern}$'
-        regex = re.compile(pattern, re.IGNORECASE)
+    def _candidate_rows(self, pattern: typ.Pattern, column: int) -> typ.Iterable[int]:
+        """Returns the rows whose cell in the given column may match the pattern, i.e. that contain all trigrams of its
+        literal parts.
 
-        row_count = self._table.rowCount()
-        found = False
-        for col in self._search_columns:
-            for row in range(start_row, row_count):
-                item = self._table.item(row, col)
-                if regex.fullmatch(item.text()):
-                    self._table.setFocus()
-                    self._table.scrollToItem(item)
-                    item.setSelected(True)
-                    found = True
-                    break
-            if found:
+        :param pattern: The pattern, as returned by compile_search_pattern.
+        :param column: The column.
+        :return: The candidate rows, in ascending order; all rows if the pattern has no literal part long enough.
+        """
+        trigrams = set()
+        for literal in self._literal_parts(pattern.pattern):
+            literal = literal.casefold()
+            trigrams.update(literal[i:i + 3] for i in range(len(literal) - 2))
+        if not trigrams:
+            return range(self._model.rowCount())
+
+        if self._trigram_index is None:
+            self._trigram_index = {col: self._build_trigram_index(col) for col in self._search_columns}
+        index = self._trigram_index[column]
+        postings = sorted((index.get(trigram, ()) for trigram in trigrams), key=len)
+        rows = set(postings[0])
+        for rows_ in postings[1:]:
+            if not rows:
                 break
+            rows.intersection_update(rows_)
+        return sorted(rows)
+
+    def _build_trigram_index(self, column: int) -> typ.Dict[str, array.array]:
+        """Indexes the case-folded trigrams of all cells in the given column.
+
+        :param column: The column.
+        :return: A dict associating each trigram to the rows containing it, in ascending order.
+        """
+        index = collections.defaultdict(list)
+        for row, text in enumerate(self._model.columns[column]):
+            text = text.casefold()
+            for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                index[trigram].append(row)
+        return {trigram: array.array('i', rows) for trigram, rows in index.items()}
+
+    @staticmethod
+    def _literal_parts(pattern: str) -> typ.List[str]:
+        """Splits a pattern returned by compile_search_pattern into the literal strings between its wildcards.
+
+        :param pattern: The pattern’s source.
+        :return: The unescaped literal parts.
+        """
+        parts = ['']
+        i = 1  # Skip leading '^'
+        end = len(pattern) - 1  # Skip trailing '$'
+        while i < end:
+            c = pattern[i]
+            if c == '\\':
+                parts[-1] += pattern[i + 1]
+                i += 2
+            elif c == '.':  # Either '.*' or '.?'
+                parts.append('')
+                i += 2
+            else:
+                parts[-1] += c
+                i += 1
+        return parts
+
+    def _invalidate_search_cache(self):
+        """Forgets the rows that matched previous queries. Must be called whenever rows are added or edited."""
+        self._search_cache.clear()
+        self._trigram_index = None
+
+    @abc.abstractmethod
+    def _fetch_rows(self) -> typ.Any:
+        """Fetches the data needed to load the rows from the database.
+
+        :return: The data, or None if an error occured.
+        """
+        pass
+
+    @abc.abstractmethod
+    def _load_rows(self, data: typ.Any):
+        """Loads all rows into the model, in a single reset.
 
-        return found
+        :param data: The data returned by _fetch_rows().
+        """
+        pass
 
     @abc.abstractmethod
     def apply(self) -> bool:
@@ -195,6 +447,42 @@ class Tab(abc.ABC, typ.Generic[_Type]):
         """
         pass
 
+    def _apply_changes(self, apply_changes: typ.Callable[..., typ.Optional[da.tags_dao.ChangesResults]]) -> bool:
+        """Applies all changes in a single call to the given DAO method. Rows whose change failed are kept pending.
+
+        :param apply_changes: A DAO method taking the added values, updated values and deleted IDs, and returning
+            whether each change succeeded or None if none could be applied.
+        :return: True if all changes were applied.
+        """
+        if self.modified_rows_number == 0:
+            return True
+        added_rows, changed_rows, deleted_rows = list(self._added_rows), list(self._changed_rows), \
+            list(self._deleted_rows)
+
+        results = apply_changes(
+            added=[self.get_value(row) for row in added_rows],
+            updated=[self.get_value(row) for row in changed_rows],
+            # Deleted rows are not validated, their values may be invalid
+            deleted_ids=[self._model.columns[0][row] for row in deleted_rows]
+        )
+        if results is None:
+            self._applied_rows = set()
+            return False
+
+        added_ok, updated_ok, deleted_ok = results
+        self._added_rows = {row for row, ok in zip(added_rows, added_ok) if not ok}
+        self._changed_rows = {row for row, ok in zip(changed_rows, updated_ok) if not ok}
+        self._deleted_rows = {row for row, ok in zip(deleted_rows, deleted_ok) if not ok}
+        self._applied_rows = {row for row, ok in zip(added_rows + changed_rows, added_ok + updated_ok) if ok}
+        return all(added_ok) and all(updated_ok) and all(deleted_ok)
+
+    @abc.abstractmethod
+    def refresh_dirty(self):
+        """Reloads from the database the rows saved by the last call to apply(), along with those that depend on
+        them.
+        """
+        pass
+
     def check_integrity(self) -> bool:
         """Checks table’s integrity.
 
@@ -216,15 +504,105 @@ class Tab(abc.ABC, typ.Generic[_Type]):
         """
         pass
 
+    def cell_data(self, row: int, col: int, role: int) -> typ.Any:
+        """Returns the data of the given cell for the given role.
+
+        :param row: Cell’s row.
+        :param col: Cell’s column.
+        :param role: The data role.
+        :return: The data or None if there is none for this role.
+        """
+        if role in (QtC.Qt.DisplayRole, QtC.Qt.EditRole):
+            return self._model.columns[col][row]
+        if role == QtC.Qt.BackgroundRole and self._editable and self._is_info_column(col):
+            return self._DISABLED_COLOR
+        return None
+
+    def cell_flags(self, col: int) -> QtC.Qt.ItemFlags:
+        """Returns the flags of the cells in the given column.
+
+        :param col: The column.
+        :return: The flags.
+        """
+        if not self._editable or self._is_info_column(col):
+            return QtC.Qt.ItemFlags(QtC.Qt.ItemIsEnabled)
+        return QtC.Qt.ItemIsEnabled | QtC.Qt.ItemIsSelectable | QtC.Qt.ItemIsEditable
+
+    def _is_info_column(self, col: int) -> bool:
+        """Tells whether the given column is the ID or use count one, which are never editable.
+
+        :param col: The column.
+        """
+        return col == 0 or col == self._model.columnCount() - 1
+
+    @abc.abstractmethod
+    def _get_headers(self) -> typ.List[str]:
+        """Returns the columns’ headers."""
+        pass
+
     @abc.abstractmethod
-    def _set_row(self, value: typ.Optional[_Type], row: int):
-        """Sets the value at the given row.
+    def _make_row(self, value: typ.Optional[_Type], count: int = 0) -> typ.List[typ.Any]:
+        """Returns the values of each column of a row.
 
-        :param value: The value.
-        :param row: The row to set.
+        :param value: The value to display or None for a new row.
+        :param count: The value’s use count.
+        :return: The row’s values.
         """
         pass
 
+    def _set_rows(self, values: typ.List[typ.Tuple[_Type, int]]):
+        """Replaces all rows of the model by the given saved values.
+
+        :param values: The values with their use count.
+        """
+        rows = [self._make_row(value, count) for value, count in values]
+        self._values = dict(enumerate(values))
+        self._saved_cells = {row: tuple(cells) for row, cells in enumerate(rows)}
+        self._modified_cells = {}
+        self._model.set_rows(rows)
+
+    def _set_row(self, row: int, value: _Type, count: int):
+        """Replaces a row of the model by the given saved value.
+
+        :param row: The row.
+        :param value: The value.
+        :param count: The value’s use count.
+        """
+        cells = self._make_row(value, count)
+        self._values[row] = value, count
+        self._saved_cells[row] = tuple(cells)
+        self._modified_cells.pop(row, None)
+        self._model.set_row(row, cells)
+
+    def _update_changed_rows(self, row: int, col: int):
+        """Marks the given row as changed if any of its cells differs from its saved value. Added rows are ignored.
+
+        :param row: The row.
+        :param col: The column of the cell that has just been edited.
+        """
+        if row in self._added_rows or row not in self._saved_cells:
+            return
+        modified_cells = self._modified_cells.setdefault(row, set())
+        if self._model.columns[col][row] != self._saved_cells[row][col]:
+            modified_cells.add(col)
+        else:
+            modified_cells.discard(col)
+        if modified_cells:
+            self._changed_rows.add(row)
+        else:
+            self._changed_rows.discard(row)
+
+    def _data_changed(self, top_left: QtC.QModelIndex, bottom_right: QtC.QModelIndex):
+        """Called when cells of the model have changed."""
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            for col in range(top_left.column(), bottom_right.column() + 1):
+                if col in self._rows_by_value:
+                    self._rows_by_value[col].setdefault(self._model.columns[col][row], set()).add(row)
+                self._cell_edited(row, col)
+
+    def _clear_rows_by_value(self):
+        self._rows_by_value.clear()
+
     @abc.abstractmethod
     def _cell_edited(self, row: int, col: int):
         """Called when a table cell is edited.
@@ -246,39 +624,264 @@ class Tab(abc.ABC, typ.Generic[_Type]):
                  EMPTY if a cell is empty;
                  FORMAT if a cell is not formatted correctly.
         """
-        for row in range(self._table.rowCount()):
-            if self._table.isRowHidden(row):
-                continue
+        # Each check is a single pass over the column’s visible values
+        values = self._model.columns[column]
+        is_row_hidden = self._proxy.is_row_hidden
+        rows = [row for row in range(len(values)) if not is_row_hidden(row)]
+        cells = [values[row] for row in rows]
+
+        invalid_row = next((row for row, cell in zip(rows, cells) if not cell.strip()), None)
+        if invalid_row is not None:
+            return self._EMPTY, invalid_row, _t('dialog.edit_tags.error.empty_cell')
+
+        pattern, message_key = self._FORMAT_PATTERNS.get(column, (None, ''))
+        if pattern is not None:
+            fullmatch = pattern.fullmatch
+            invalid_row = next((row for row, cell in zip(rows, cells) if fullmatch(cell) is None), None)
+            if invalid_row is not None:
+                return self._FORMAT, invalid_row, _t(message_key)
+
+        invalid_row, message = self._check_column_format(column, rows)
+        if invalid_row is not None:
+            return self._FORMAT, invalid_row, message
+
+        if check_duplicates and len(set(cells)) != len(cells):
+            # First row holding each value
+            seen: typ.Dict[str, int] = {}
+            for row, cell in zip(rows, cells):
+                if cell in seen:
+                    return self._DUPLICATE, row, _t('dialog.edit_tags.error.duplicate_value', row=seen[cell])
+                seen[cell] = row
+        return self._OK, -1, ''
 
-            if self._table.item(row, column).text().strip() == '':
-                return self._EMPTY, row, _t('dialog.edit_tags.error.empty_cell')
+    def _check_column_format(self, column: int, rows: typ.List[int]) -> typ.Tuple[typ.Optional[int], str]:
+        """Checks the format of the given cells of a column, beyond the column’s pattern in _FORMAT_PATTERNS.
+        Calls _check_cell_format on each cell by default.
 
-            ok, message = self._check_cell_format(row, column)
+        :param column: The column.
+        :param rows: The rows to check.
+        :return: The first invalid row or None if all are valid, and the error message.
+        """
+        check_cell_format = self._check_cell_format
+        for row in rows:
+            ok, message = check_cell_format(row, column)
             if not ok:
-                return self._FORMAT, row, message
-
-            if check_duplicates:
-                cell_value = self._table.item(row, column).text()
-                for r in range(self._table.rowCount()):
-                    if self._table.isRowHidden(r):
-                        continue
-                    if r != row and self._table.item(r, column).text() == cell_value:
-                        return self._DUPLICATE, r, _t('dialog.edit_tags.error.duplicate_value', row=row)
+                return row, message
+        return None, ''
+
+    def _check_cell(self, row: int, column: int) -> typ.Tuple[int, int, str]:
+        """Checks the integrity of a single cell. Unlike _check_column, only the given cell is checked for duplicates.
+
+        :param row: Cell’s row.
+        :param column: Cell’s column.
+        :return: A tuple with 3 values, as returned by _check_column.
+        """
+        status, message = self._check_cell_content(row, column)
+        if status != self._OK:
+            return status, row, message
+
+        if self._columns_to_check.get(column, True):
+            values = self._model.columns[column]
+            if column not in self._rows_by_value:
+                rows_by_value = {}
+                for r, value in enumerate(values):
+                    rows_by_value.setdefault(value, set()).add(r)
+                self._rows_by_value[column] = rows_by_value
+            value = values[row]
+            duplicates = [r for r in self._rows_by_value[column].get(value, ())
+                          if r != row and values[r] == value and not self._proxy.is_row_hidden(r)]
+            if duplicates:
+                return self._DUPLICATE, row, _t('dialog.edit_tags.error.duplicate_value', row=min(duplicates))
         return self._OK, -1, ''
 
-    @abc.abstractmethod
+    def _check_cell_content(self, row: int, column: int) -> typ.Tuple[int, str]:
+        """Checks that a cell is not empty and is formatted correctly.
+
+        :param row: Cell’s row.
+        :param column: Cell’s column.
+        :return: A tuple with the cell’s integrity, which is one of OK, EMPTY or FORMAT, and the error message.
+        """
+        value = self._model.columns[column][row]
+        if value.strip() == '':
+            return self._EMPTY, _t('dialog.edit_tags.error.empty_cell')
+        pattern, message_key = self._FORMAT_PATTERNS.get(column, (None, ''))
+        if pattern is not None and pattern.fullmatch(value) is None:
+            return self._FORMAT, _t(message_key)
+        ok, message = self._check_cell_format(row, column)
+        if not ok:
+            return self._FORMAT, message
+        return self._OK, ''
+
     def _check_cell_format(self, row: int, col: int) -> (bool, str):
-        """Checks the format of the cell at the given position.
+        """Checks the format of the cell at the given position, beyond the column’s pattern in _FORMAT_PATTERNS.
 
         :param row: Cell’s row.
         :param col: Cell’s column.
         :return: True if the cell content's format is correct.
         """
-        pass
+        return True, ''
+
+
+class TagsModel(QtC.QAbstractTableModel):
+    """Table model holding the rows of a tab. Values are stored column by column, each column being a list or an
+    array of the same length. Cells’ data and flags are provided by the tab.
+    """
+    # Role returning a dict with the data of all roles used to paint a cell
+    MULTIPLE_ROLES = QtC.Qt.UserRole
+    _PAINT_ROLES = (QtC.Qt.DisplayRole, QtC.Qt.FontRole, QtC.Qt.BackgroundRole, QtC.Qt.ForegroundRole)
+
+    def __init__(self, tab: Tab, headers: typ.List[str], typecodes: typ.List[typ.Optional[str]],
+                 parent: QtC.QObject = None):
+        """Creates a model.
+
+        :param tab: The tab this model belongs to.
+        :param headers: The columns’ headers.
+        :param typecodes: For each column, the typecode of the array storing its values or None to store them in a
+            list.
+        :param parent: The parent object.
+        """
+        super().__init__(parent)
+        self._tab = tab
+        self._headers = headers
+        self._typecodes = typecodes
+        self._columns = self._new_columns([()] * len(headers))
+        self._row_count = 0
+
+    @property
+    def columns(self) -> typ.List[typ.MutableSequence[typ.Any]]:
+        """Returns the values of each column. They must not be modified directly."""
+        return self._columns
+
+    def row(self, row: int) -> typ.List[typ.Any]:
+        """Returns the values of a row.
+
+        :param row: The row.
+        :return: The value of each column.
+        """
+        return [column[row] for column in self._columns]
+
+    def set_rows(self, rows: typ.List[typ.List[typ.Any]]):
+        """Replaces all rows.
+
+        :param rows: The new rows.
+        """
+        self.beginResetModel()
+        self._columns = self._new_columns(list(zip(*rows)) or [()] * len(self._headers))
+        self._row_count = len(rows)
+        self.endResetModel()
+
+    def set_row(self, row: int, values: typ.List[typ.Any]):
+        """Replaces the values of a row.
+
+        :param row: The row.
+        :param values: The row’s new values.
+        """
+        for column, value in zip(self._columns, values):
+            column[row] = value
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self._headers) - 1),
+                              [QtC.Qt.DisplayRole, QtC.Qt.EditRole])
+
+    def append_row(self, values: typ.List[typ.Any]):
+        """Adds a row at the end.
+
+        :param values: The row’s values.
+        """
+        row = self._row_count
+        self.beginInsertRows(QtC.QModelIndex(), row, row)
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        self._row_count += 1
+        self.endInsertRows()
+
+    def _new_columns(self, columns: typ.List[typ.Iterable[typ.Any]]) -> typ.List[typ.MutableSequence[typ.Any]]:
+        """Creates the storage of each column.
+
+        :param columns: The values of each column.
+        :return: The columns’ storage.
+        """
+        return [array.array(typecode, values) if typecode else list(values)
+                for typecode, values in zip(self._typecodes, columns)]
+
+    def rowCount(self, parent: QtC.QModelIndex = QtC.QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent: QtC.QModelIndex = QtC.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section: int, orientation: QtC.Qt.Orientation, role: int = QtC.Qt.DisplayRole):
+        if role == QtC.Qt.DisplayRole and orientation == QtC.Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QtC.QModelIndex, role: int = QtC.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == self.MULTIPLE_ROLES:
+            row, col = index.row(), index.column()
+            return {role_: self._tab.cell_data(row, col, role_) for role_ in self._PAINT_ROLES}
+        return self._tab.cell_data(index.row(), index.column(), role)
+
+    def flags(self, index: QtC.QModelIndex) -> QtC.Qt.ItemFlags:
+        if not index.isValid():
+            return QtC.Qt.NoItemFlags
+        return self._tab.cell_flags(index.column())
+
+    def setData(self, index: QtC.QModelIndex, value: typ.Any, role: int = QtC.Qt.EditRole) -> bool:
+        if not index.isValid() or role != QtC.Qt.EditRole:
+            return False
+        column = self._columns[index.column()]
+        if column[index.row()] == value:
+            return False
+        column[index.row()] = value
+        self.dataChanged.emit(index, index, [QtC.Qt.DisplayRole, QtC.Qt.EditRole])
+        return True
+
+
+class _TabProxyModel(QtC.QSortFilterProxyModel):
+    """Proxy model that sorts the rows of a tab and hides deleted ones."""
+
+    def __init__(self, parent: QtC.QObject = None):
+        super().__init__(parent)
+        self._hidden_rows = set()
+        # Flags of tabs’ cells only depend on their column
+        self._flags_cache: typ.Dict[int, QtC.Qt.ItemFlags] = {}
+
+    def hide_rows(self, rows: typ.Iterable[int]):
+        """Hides the given rows.
+
+        :param rows: The source model’s rows to hide.
+        """
+        self._hidden_rows.update(rows)
+        self.invalidateFilter()
+
+    def is_row_hidden(self, row: int) -> bool:
+        """Tells whether the given source model’s row is hidden."""
+        return row in self._hidden_rows
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QtC.QModelIndex) -> bool:
+        return source_row not in self._hidden_rows
+
+    def flags(self, index: QtC.QModelIndex) -> QtC.Qt.ItemFlags:
+        if not index.isValid():
+            return QtC.Qt.NoItemFlags
+        col = index.column()
+        if col not in self._flags_cache:
+            self._flags_cache[col] = super().flags(index)
+        return self._flags_cache[col]
+
+    def headerData(self, section: int, orientation: QtC.Qt.Orientation, role: int = QtC.Qt.DisplayRole):
+        # Number rows in display order
+        if role == QtC.Qt.DisplayRole and orientation == QtC.Qt.Vertical:
+            return section + 1
+        return super().headerData(section, orientation, role)
 
 
 class TagTypesTab(Tab[model.TagType]):
     """This class represents a tab containing a table that displays all defined tag types."""
+    _FORMAT_PATTERNS = {
+        1: (model.TagType.LABEL_PATTERN, 'dialog.edit_tags.error.invalid_tag_name'),
+        2: (model.TagType.SYMBOL_PATTERN, 'dialog.edit_tags.error.invalid_tag_type_symbol'),
+    }
 
     def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, editable: bool,
                  selection_changed: typ.Optional[typ.Callable[[None], None]] = None,
@@ -297,8 +900,6 @@ class TagTypesTab(Tab[model.TagType]):
             owner,
             dao,
             _t('dialog.edit_tags.tab.tag_types.title'),
-            addable=True,
-            deletable=True,
             editable=editable,
             columns_to_check=[(1, True), (2, True)],
             search_columns=[1, 2],
@@ -306,175 +907,111 @@ class TagTypesTab(Tab[model.TagType]):
             cell_changed=cell_changed,
             rows_deleted=rows_deleted
         )
+        # Types as they are in the database, as of the last load or refresh
+        self._saved_types: typ.List[model.TagType] = []
 
-    def init(self):
-        super().init()
+    def _fetch_rows(self) -> typ.Optional[typ.List[typ.Tuple[model.TagType, int]]]:
+        return self._tags_dao.get_all_tag_types(get_count=True)
 
+    def _load_rows(self, values: typ.Optional[typ.List[typ.Tuple[model.TagType, int]]]):
         self._dummy_type_id = -1
 
-        self._table.setColumnCount(5)
-        self._table.setColumnWidth(0, 30)
-        self._table.setHorizontalHeaderLabels([
-            _t('dialog.edit_tags.tab.tag_types.table.header.type_id'),
-            _t('dialog.edit_tags.tab.tag_types.table.header.label'),
-            _t('dialog.edit_tags.tab.tag_types.table.header.symbol'),
-            _t('dialog.edit_tags.tab.tag_types.table.header.color'),
-            _t('dialog.edit_tags.tab.tags_common.table.header.usage'),
-        ])
-
-        self._values = self._tags_dao.get_all_tag_types(get_count=True)
-        self._table.setRowCount(len(self._values))
-
-        if self._values is not None:
-            for i, (tag_type, count) in enumerate(self._values):
-                tag_type.count = count
-                self._set_row(tag_type, i)
+        if values is not None:
+            self._saved_types = [tag_type for tag_type, _ in values]
+            self._set_rows(values)
         else:
             utils.gui.show_error(_t('popup.tag_types_load_error.text'), parent=self._owner)
-            self._values = []
-
-        self._initialized = True
+            self._set_rows([])
 
     def apply(self) -> bool:
-        ok = True
-
-        to_keep = []
-        for row in self._added_rows:
-            res = self._tags_dao.add_type(self.get_value(row))
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._added_rows = set(to_keep)
-
-        to_keep = []
-        for row in self._deleted_rows:
-            res = self._tags_dao.delete_type(self.get_value(row).id)
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._deleted_rows = set(to_keep)
-
-        to_keep = []
-        for row in self._changed_rows:
-            res = self._tags_dao.update_type(self.get_value(row))
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._changed_rows = set(to_keep)
+        return self._apply_changes(self._tags_dao.apply_type_changes)
 
-        return ok
+    def refresh_dirty(self):
+        values = self._tags_dao.get_all_tag_types(get_count=True)
+        if values is None:
+            utils.gui.show_error(_t('popup.tag_types_load_error.text'), parent=self._owner)
+            return
+        self._saved_types = [tag_type for tag_type, _ in values]
+        types_by_label = {tag_type.label: (tag_type, count) for tag_type, count in values}
 
-    def get_value(self, row: int) -> typ.Optional[model.TagType]:
-        args = {}
-
-        for i in range(self._table.columnCount()):
-            cell = self._table.item(row, i)
-            if cell is None:
-                cell = self._table.cellWidget(row, i)
-            arg = cell.whatsThis()
-            if arg == '':
+        # Use counts may also have been changed by the other tabs
+        self._initialized = False
+        labels, counts = self._model.columns[1], self._model.columns[4]
+        for row in range(self._model.rowCount()):
+            if self._proxy.is_row_hidden(row) or row in self._added_rows or row in self._changed_rows:
                 continue
-            if arg == 'color':
-                args[arg] = cell.palette().button().color()
-            else:
-                args[arg] = cell.text() if arg != 'ident' else int(cell.text())
+            tag_type, count = types_by_label.get(labels[row], (None, 0))
+            if tag_type is not None and (row in self._applied_rows or count != counts[row]):
+                self._set_row(row, tag_type, count)
+        self._initialized = True
+        self._applied_rows = set()
 
+    def get_value(self, row: int) -> typ.Optional[model.TagType]:
+        ident, label, symbol, color, _ = self._model.row(row)
         try:
-            return model.TagType(**args)
+            return model.TagType(ident=ident, label=label, symbol=symbol, color=color)
         except ValueError:
             return None
 
+    @property
+    def saved_types(self) -> typ.List[model.TagType]:
+        """Returns the types as they were in the database when this tab was last loaded or refreshed."""
+        return self._saved_types
+
+    def get_labels(self) -> typ.Dict[int, str]:
+        """Returns the current label of each type, by ID."""
+        return {ident: label for row, (ident, label) in enumerate(zip(self._model.columns[0], self._model.columns[1]))
+                if not self._proxy.is_row_hidden(row)}
+
+    def init(self):
+        super().init()
+        self._table.setItemDelegateForColumn(3, _ColorDelegate(self._editable, parent=self._table))
+
+    def cell_data(self, row: int, col: int, role: int) -> typ.Any:
+        if col == 3:
+            color = self._model.columns[col][row]
+            if role == QtC.Qt.DisplayRole:
+                return color.name()
+            if role == QtC.Qt.BackgroundRole:
+                return color
+            if role == QtC.Qt.ForegroundRole:
+                return utils.gui.font_color(color)
+        return super().cell_data(row, col, role)
+
+    def cell_flags(self, col: int) -> QtC.Qt.ItemFlags:
+        flags = super().cell_flags(col)
+        if col == 3:  # Colors are edited through a color picker, see _ColorDelegate
+            # noinspection PyTypeChecker
+            flags &= ~QtC.Qt.ItemIsEditable
+        return flags
+
+    def _get_headers(self) -> typ.List[str]:
+        return [
+            _t('dialog.edit_tags.tab.tag_types.table.header.type_id'),
+            _t('dialog.edit_tags.tab.tag_types.table.header.label'),
+            _t('dialog.edit_tags.tab.tag_types.table.header.symbol'),
+            _t('dialog.edit_tags.tab.tag_types.table.header.color'),
+            _t('dialog.edit_tags.tab.tags_common.table.header.usage'),
+        ]
+
+    def _make_row(self, tag_type: typ.Optional[model.TagType], count: int = 0) -> typ.List[typ.Any]:
+        if tag_type is None:
+            return [self._dummy_type_id, _t('dialog.edit_tags.tab.tag_types.table.default_label'), '§',
+                    QtG.QColor(0, 0, 0), count]
+        return [tag_type.id, tag_type.label, tag_type.symbol, tag_type.color, count]
+
     def _cell_edited(self, row: int, col: int):
+        self._invalidate_search_cache()
         if self._initialized and self._editable:
             if col != 3:
-                status, invalid_row, message = self._check_column(col, self._columns_to_check.get(col, True))
+                status, invalid_row, message = self._check_cell(row, col)
                 if status != self._OK:
                     utils.gui.show_error(message, parent=self._owner)
 
-            if row not in self._added_rows:
-                if self.get_value(row) != self._values[row]:
-                    self._changed_rows.add(row)
-                elif row in self._changed_rows:
-                    self._changed_rows.remove(row)
+            self._update_changed_rows(row, col)
 
             if self._cell_changed is not None:
-                cell = self._table.item(row, col)
-                if cell is None:
-                    cell = self._table.cellWidget(row, col)
-                self._cell_changed(row, col, cell.text())
-
-    def _check_cell_format(self, row: int, col: int) -> (bool, str):
-        text = self._table.item(row, col).text()
-        if col == 1:
-            return model.TagType.LABEL_PATTERN.match(text) is not None, \
-                   _t('dialog.edit_tags.error.invalid_tag_name')
-        if col == 2:
-            return (model.TagType.SYMBOL_PATTERN.match(text) is not None,
-                    _t('dialog.edit_tags.error.invalid_tag_type_symbol'))
-        return True, ''
-
-    def _set_row(self, tag_type: typ.Optional[model.TagType], row: int):
-        defined = tag_type is not None
-        id_item = _IntTableWidgetItem(str(tag_type.id) if defined else str(self._dummy_type_id))
-        id_item.setWhatsThis('ident')
-        # noinspection PyTypeChecker
-        id_item.setFlags(id_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        if self._editable:
-            id_item.setBackground(self._DISABLED_COLOR)
-        self._table.setItem(row, 0, id_item)
-
-        label_item = QtW.QTableWidgetItem(tag_type.label if defined
-                                          else _t('dialog.edit_tags.tab.tag_types.table.default_label'))
-        label_item.setWhatsThis('label')
-        if not self._editable:
-            # noinspection PyTypeChecker
-            label_item.setFlags(label_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        self._table.setItem(row, 1, label_item)
-
-        symbol_item = QtW.QTableWidgetItem(tag_type.symbol if defined else '§')
-        symbol_item.setWhatsThis('symbol')
-        if not self._editable:
-            # noinspection PyTypeChecker
-            symbol_item.setFlags(symbol_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        self._table.setItem(row, 2, symbol_item)
-
-        default_color = QtG.QColor(0, 0, 0)
-        bg_color = tag_type.color if defined else default_color
-        color_btn = QtW.QPushButton(tag_type.color.name() if defined else default_color.name(), parent=self._owner)
-        color_btn.setWhatsThis('color')
-        self._set_button_bg_color(color_btn, bg_color)
-        color_btn.setFocusPolicy(QtC.Qt.NoFocus)
-        color_btn.clicked.connect(self._show_color_picker)
-        color_btn.setProperty('row', row)
-        if not self._editable:
-            color_btn.setEnabled(False)
-        self._table.setCellWidget(row, 3, color_btn)
-
-        # count property is added to tag argument before calling this method.
-        # noinspection PyUnresolvedReferences
-        number_item = _IntTableWidgetItem(str(tag_type.count if defined else 0))
-        # noinspection PyTypeChecker
-        number_item.setFlags(number_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        if self._editable:
-            number_item.setBackground(self._DISABLED_COLOR)
-        self._table.setItem(row, 4, number_item)
-
-    def _show_color_picker(self):
-        """Shows a color picker then sets the event button to the selected color."""
-        # noinspection PyTypeChecker
-        button: QtW.QPushButton = self._owner.sender()
-        # Set initial color to the button’s current background color
-        color = QtW.QColorDialog.getColor(button.palette().button().color(), parent=self._owner)
-        if color.isValid():
-            row = button.property('row')
-            button.setText(color.name())
-            self._set_button_bg_color(button, color)
-            self._cell_edited(row, 3)
-
-    @staticmethod
-    def _set_button_bg_color(button: QtW.QPushButton, color: QtG.QColor):
-        button.setStyleSheet(
-            f'background-color: {color.name()}; color: {utils.gui.font_color(color).name()}; border: none')
+                self._cell_changed(row, col, self.cell_data(row, col, QtC.Qt.DisplayRole))
 
 
 _TagType = typ.TypeVar('_TagType', model.Tag, model.CompoundTag)
@@ -482,11 +1019,13 @@ _TagType = typ.TypeVar('_TagType', model.Tag, model.CompoundTag)
 
 class _TagsTab(Tab[_TagType], typ.Generic[_TagType], metaclass=abc.ABCMeta):
     """This class represents a tab containing a table that displays all defined tags."""
-    COMBO_ITEM_PATTERN = re.compile(r'^(\d+) - (.+)$')
+    _FORMAT_PATTERNS = {
+        1: (model.Tag.LABEL_PATTERN, 'dialog.edit_tags.error.invalid_tag_name'),
+    }
 
-    def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, title: str, addable: bool, editable: bool,
-                 tag_class: typ.Type[_TagType], additional_columns: typ.List[typ.Tuple[str, bool]],
-                 additional_search_columns: typ.List[int],
+    def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, title: str, editable: bool,
+                 tag_types: typ.List[model.TagType], type_labels: typ.Dict[int, str], tag_class: typ.Type[_TagType],
+                 additional_columns: typ.List[typ.Tuple[str, bool]], additional_search_columns: typ.List[int],
                  selection_changed: typ.Optional[typ.Callable[[None], None]] = None,
                  cell_changed: typ.Optional[typ.Callable[[int, int, str], None]] = None,
                  rows_deleted: typ.Optional[typ.Callable[[typ.List[_TagType]], None]] = None):
@@ -495,8 +1034,9 @@ class _TagsTab(Tab[_TagType], typ.Generic[_TagType], metaclass=abc.ABCMeta):
         :param owner: Tab’s owner.
         :param dao: The tag’s DAO.
         :param title: Tab's title.
-        :param addable: If true rows can be added to this tab.
         :param editable: If true the contained table will be editable.
+        :param tag_types: The saved tag types. It is shared with the owner, which keeps it up to date.
+        :param type_labels: The label of each tag type, by ID. It is shared with the owner, which keeps it up to date.
         :param tag_class: Type of tags, either NORMAL or COMPOUND.
         :param additional_columns: Titles of additional columns. They will be inserted between label and type columns.
         :param additional_search_columns: List of column indices in which searching is allowed.
@@ -508,8 +1048,8 @@ class _TagsTab(Tab[_TagType], typ.Generic[_TagType], metaclass=abc.ABCMeta):
             (1, True),
             *[(c, additional_columns[c - 2][1]) for c in range(2, 2 + len(additional_columns))]
         ]
-        search_cols = [1, *map(lambda i: i + 2, additional_search_columns)]
-        super().__init__(owner, dao, title, addable, True, editable, cols_to_check, search_cols,
+        search_cols = [1, *[i + 2 for i in additional_search_columns]]
+        super().__init__(owner, dao, title, editable, cols_to_check, search_cols,
                          selection_changed=selection_changed, cell_changed=cell_changed, rows_deleted=rows_deleted)
         self._tag_class = tag_class
         self._columns = [
@@ -521,238 +1061,163 @@ class _TagsTab(Tab[_TagType], typ.Generic[_TagType], metaclass=abc.ABCMeta):
         ]
         self._type_column = 2 + len(additional_columns)
         self._tag_use_count_column = 1 + self._type_column
+        # The type column holds type IDs, their labels are looked up when displayed
+        self._type_labels = type_labels
+        # Types that can be selected in the type column
+        self._tag_types = tag_types
 
-    def init(self):
-        super().init()
-
-        self._table.setColumnCount(len(self._columns))
-        self._table.setColumnWidth(0, 30)
-        self._table.setHorizontalHeaderLabels(self._columns)
+    def _fetch_rows(self) -> typ.Optional[typ.List[typ.Tuple[_TagType, int]]]:
+        # Types are not fetched here, they are shared by the owner
+        return self._tags_dao.get_all_tags(self._tag_class, sort_by_label=True, get_count=self._tag_class == model.Tag)
 
-        self._values = self._tags_dao.get_all_tags(self._tag_class, sort_by_label=True,
-                                                   get_count=self._tag_class == model.Tag)
-        self._table.setRowCount(len(self._values) if self._values is not None else 0)
+    def _load_rows(self, values: typ.Optional[typ.List[typ.Tuple[_TagType, int]]]):
+        if self._editable:
+            self._table.setItemDelegateForColumn(
+                self._type_column, _TagTypeDelegate(self._tag_types, self._type_labels, parent=self._table))
 
-        if self._values is not None:
+        if values is not None:
             if self._tag_class == model.CompoundTag:  # Add dummy count
-                self._values = [(v, 0) for v in self._values]
-            for i, (tag, count) in enumerate(self._values):
-                tag.count = count
-                # noinspection PyTypeChecker
-                self._set_row(tag, i)
+                values = [(v, 0) for v in values]
+            self._set_rows(values)
         else:
             utils.gui.show_error(_t('popup.tags_load_error.text'), parent=self._owner)
-            self._values = []
-
-        self._initialized = True
+            self._set_rows([])
 
     def apply(self) -> bool:
-        ok = True
+        return self._apply_changes(self._tags_dao.apply_tag_changes)
 
-        to_keep = []
-        for row in self._added_rows:
-            res = self._tags_dao.add_compound_tag(self.get_value(row))
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._added_rows = set(to_keep)
-
-        to_keep = []
-        for row in self._deleted_rows:
-            res = self._tags_dao.delete_tag(self.get_value(row).id)
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._deleted_rows = set(to_keep)
-
-        to_keep = []
-        for row in self._changed_rows:
-            res = self._tags_dao.update_tag(self.get_value(row))
-            if not res:
-                to_keep.append(row)
-            ok &= res
-        self._changed_rows = set(to_keep)
-
-        return ok
+    def refresh_dirty(self):
+        # The shared types must have been refreshed beforehand
+        types_by_id = {tag_type.id: tag_type for tag_type in self._tag_types}
 
-    def get_value(self, row: int) -> typ.Optional[_TagType]:
-        args = {}
+        tags_by_label = None
 
-        for i in range(self._table.columnCount()):
-            cell = self._table.item(row, i)
-            if cell is None:
-                cell = self._table.cellWidget(row, i)
-            if cell is None:
-                continue
-            arg = cell.whatsThis()
-            if arg == '':
+        # Rows whose type has been edited in the types tab must be reloaded too
+        self._initialized = False
+        labels, counts = self._model.columns[1], self._model.columns[self._tag_use_count_column]
+        for row in range(self._model.rowCount()):
+            if self._proxy.is_row_hidden(row) or row in self._added_rows or row in self._changed_rows:
                 continue
-            if arg == 'tag_type':
-                if cell.currentIndex() != 0:
-                    ident = self._id_from_combo(cell.currentText())
-                    if ident is not None:
-                        args[arg] = self._tags_dao.get_tag_type_from_id(ident)
-            else:
-                args[arg] = cell.text() if arg != 'ident' else int(cell.text())
+            tag_type = self._values[row][0].type if row in self._values else None
+            if row in self._applied_rows or tag_type is not None and tag_type != types_by_id.get(tag_type.id):
+                if tags_by_label is None:
+                    # Fetch all tags at most once rather than one query per row
+                    tags_by_label = {tag.label: tag for tag in self._tags_dao.get_all_tags(tag_class=self._tag_class)
+                                     or []}
+                tag = tags_by_label.get(labels[row])
+                if tag is not None:
+                    self._set_row(row, tag, counts[row])
+        self._initialized = True
+        self._applied_rows = set()
+
+    def get_value(self, row: int) -> typ.Optional[_TagType]:
+        values = self._model.row(row)
+        args = {'ident': values[0], 'label': values[1]}
+        for i, column in enumerate(self._columns[2:-2]):
+            args[self._get_value_for_column(column, None, True)[1]] = values[2 + i]
+        type_id = values[self._type_column]
+        if type_id is not None:
+            args['tag_type'] = next((tag_type for tag_type in self._tag_types if tag_type.id == type_id), None)
 
         try:
             return self._tag_class(**args)
         except ValueError:
             return None
 
+    def cell_data(self, row: int, col: int, role: int) -> typ.Any:
+        if col == self._type_column:
+            type_id = self._model.columns[col][row]
+            if role == QtC.Qt.DisplayRole:
+                if type_id is None:
+                    return _t('dialog.edit_tags.tab.tags_common.table.combo_no_type')
+                return self._type_labels.get(type_id, '')
+            if role == QtC.Qt.FontRole and type_id is None:
+                font = QtG.QFont()
+                font.setItalic(True)
+                return font
+        return super().cell_data(row, col, role)
+
     def update_type_label(self, tag_type: model.TagType):
-        """Updates the name of the given type in all comboboxes.
+        """Repaints the table after the label of the given type changed. Labels are read from the shared labels dict,
+        which must have been updated beforehand.
 
-        :param tag_type: The type to update.
+        :param tag_type: The updated type.
         """
-        for tag_row in range(self._table.rowCount()):
-            if not self._table.isRowHidden(tag_row):
-                combo = self._table.cellWidget(tag_row, self._type_column)
-                for i in range(combo.count()):
-                    if combo.itemText(i).startswith(f'{tag_type.id} '):
-                        combo.setItemText(i, self._get_combo_text(tag_type.id, tag_type.label))
-                        break
+        self._table.viewport().update()
 
     def delete_types(self, deleted_types: typ.List[model.TagType]):
-        """Removes from all comboboxes the tag types that have been deleted.
+        """Removes the tag types that have been deleted from all rows. The owner is responsible for removing them from
+        the shared types.
 
         :param deleted_types: All deleted tag types.
         """
-        for tag_type in deleted_types:
-            ident, label = tag_type.id, tag_type.label
-            for tag_row in range(self._table.rowCount()):
-                combo = self._table.cellWidget(tag_row, self._type_column)
-                current_type = self._label_from_combo(combo.currentText())
-                combo.removeItem(combo.findText(self._get_combo_text(ident, label)))
-                if current_type == label:
-                    combo.setCurrentIndex(0)
+        deleted_ids = {tag_type.id for tag_type in deleted_types if tag_type is not None}
+        for row, type_id in enumerate(self._model.columns[self._type_column]):
+            if type_id in deleted_ids:
+                self._model.setData(self._model.index(row, self._type_column), None)
 
-    def _set_row(self, tag: typ.Optional[_TagType], row: int):
-        defined = tag is not None
-        id_item = _IntTableWidgetItem(str(tag.id if defined else self._dummy_type_id))
-        id_item.setWhatsThis('ident')
-        # noinspection PyTypeChecker
-        id_item.setFlags(id_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        if self._editable:
-            id_item.setBackground(self._DISABLED_COLOR)
-        self._table.setItem(row, 0, id_item)
-
-        label_item = QtW.QTableWidgetItem(tag.label if defined else 'new_tag')
-        label_item.setWhatsThis('label')
-        self._table.setItem(row, 1, label_item)
-
-        # Populate additional columns
-        for j, column in enumerate(self._columns[2:-2]):
-            value, cell_label = self._get_value_for_column(column, tag, not defined)
-            item = QtW.QTableWidgetItem(value)
-            item.setWhatsThis(cell_label)
-            if not self._editable:
-                # noinspection PyTypeChecker
-                item.setFlags(item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-            self._table.setItem(row, 2 + j, item)
-
-        if not self._editable:
-            # noinspection PyTypeChecker
-            label_item.setFlags(label_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
+    def _get_headers(self) -> typ.List[str]:
+        return self._columns
 
-            if defined and tag.type:
-                text = tag.type.label
-            else:
-                text = _t('dialog.edit_tags.tab.tags_common.table.combo_no_type')
-            type_item = QtW.QTableWidgetItem(text)
-            font = type_item.font()
-            font.setItalic(not defined or not tag.type)
-            type_item.setFont(font)
-            # noinspection PyTypeChecker
-            type_item.setFlags(type_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-            self._table.setItem(row, self._type_column, type_item)
-        else:
-            combo = QtW.QComboBox(parent=self._owner)
-            combo.currentIndexChanged.connect(self._combo_changed)
-            combo.setWhatsThis('tag_type')
-            combo.setProperty('row', row)
-            combo.addItem(_t('dialog.edit_tags.tab.tags_common.table.combo_no_type'))
-            for tag_type in self._tags_dao.get_all_tag_types():
-                combo.addItem(self._get_combo_text(tag_type.id, tag_type.label))
-            if defined and tag.type is not None:
-                combo.setCurrentIndex(combo.findText(self._get_combo_text(tag.type.id, tag.type.label)))
-            self._table.setCellWidget(row, self._type_column, combo)
-
-        # count property is added to tag argument before calling this method.
-        number_item = _IntTableWidgetItem(str(getattr(tag, 'count') if defined else 0))
-        # noinspection PyTypeChecker
-        number_item.setFlags(number_item.flags() & ~QtC.Qt.ItemIsEditable & ~QtC.Qt.ItemIsSelectable)
-        if self._editable:
-            number_item.setBackground(self._DISABLED_COLOR)
-        self._table.setItem(row, self._tag_use_count_column, number_item)
+    def _make_row(self, tag: typ.Optional[_TagType], count: int = 0) -> typ.List[typ.Any]:
+        defined = tag is not None
+        # Types missing from the labels dict have been deleted from the types tab
+        has_type = defined and tag.type is not None and tag.type.id in self._type_labels
+        return [
+            tag.id if defined else self._dummy_type_id,
+            tag.label if defined else 'new_tag',
+            *[self._get_value_for_column(column, tag, not defined)[0] for column in self._columns[2:-2]],
+            tag.type.id if has_type else None,
+            count,
+        ]
 
-    def _get_value_for_column(self, column_name: str, value: _TagType, default: bool) -> typ.Tuple[str, str]:
+    def _get_value_for_column(self, column_name: str, value: typ.Optional[_TagType], default: bool) \
+            -> typ.Tuple[str, str]:
         """Returns the value for the given column and tag.
 
         :param column_name: Column’s name.
         :param value: The tag.
-        :return: A tuple with the value and the cell label.
+        :param default: If true, the default value for the column is returned.
+        :return: A tuple with the value and the name of the tag’s attribute.
         """
         pass
 
     def _cell_edited(self, row: int, col: int):
+        self._invalidate_search_cache()
         if self._initialized and self._editable:
             if col != self._type_column:
-                status, invalid_row, message = self._check_column(col, self._columns_to_check.get(col, True))
+                status, invalid_row, message = self._check_cell(row, col)
                 if status != self._OK:
                     utils.gui.show_error(message, parent=self._owner)
 
-            if row not in self._added_rows:
-                if self.get_value(row) != self._values[row][0]:
-                    self._changed_rows.add(row)
-                elif row in self._changed_rows:
-                    self._changed_rows.remove(row)
+            self._update_changed_rows(row, col)
 
             if self._cell_changed is not None:
-                text = self._table.item(row, col).text() if col != self._type_column else \
-                    self._table.cellWidget(row, col).currentText()
-                self._cell_changed(row, col, text)
+                self._cell_changed(row, col, self.cell_data(row, col, QtC.Qt.DisplayRole))
 
     def _check_cell_format(self, row: int, col: int) -> (bool, str):
-        text = self._table.item(row, col).text()
         if col == 1:
-            if model.Tag.LABEL_PATTERN.match(text) is None:
-                return False, _t('dialog.edit_tags.error.invalid_tag_name')
-            tag_id = int(self._table.item(row, 0).text())
+            tag_id, text = self._model.columns[0][row], self._model.columns[1][row]
             if self._tags_dao.tag_exists(tag_id, text):
                 return False, _t('dialog.edit_tags.error.duplicate_tag_name')
         return True, ''
 
-    def _combo_changed(self, _):
-        """Called when a combobox changes."""
-        if self._initialized:
-            combo = self._owner.sender()
-            self._cell_edited(combo.property('row'), self._type_column)
-
-    def _label_from_combo(self, text: str) -> typ.Optional[str]:
-        """Returns the label of the tag type represented by the given text from a combobox.
-
-        :param text: The text to get the label from.
-        :return: The type's label or None.
-        """
-        match = self.COMBO_ITEM_PATTERN.search(text)
-        if match is not None:
-            return match.group(2)
-        return None
-
-    def _id_from_combo(self, text: str) -> typ.Optional[int]:
-        """Returns the ID of the tag type represented by the given text from a combobox.
-
-        :param text: The text to get the ID from.
-        :return: The ID or None.
-        """
-        match = self.COMBO_ITEM_PATTERN.search(text)
-        if match is not None:
-            return int(match.group(1))
-        return None
+    def _check_column_format(self, column: int, rows: typ.List[int]) -> typ.Tuple[typ.Optional[int], str]:
+        # Look for labels used by other tags in a single query instead of one per row
+        tags = self._tags_dao.get_all_tags() if column == 1 else None
+        if tags is None:
+            return super()._check_column_format(column, rows)
+        ids_by_label = collections.defaultdict(set)
+        for tag in tags:
+            ids_by_label[tag.label].add(tag.id)
+        ids, labels = self._model.columns[0], self._model.columns[1]
+        for row in rows:
+            if ids_by_label.get(labels[row], set()) - {ids[row]}:
+                return row, _t('dialog.edit_tags.error.duplicate_tag_name')
+        return None, ''
 
     @staticmethod
-    def _get_combo_text(ident: int, label: str) -> str:
+    def get_combo_text(ident: int, label: str) -> str:
         """Formats an ID and label to a combobox item label.
 
         :param ident: Type’s ID.
@@ -763,7 +1228,10 @@ class _TagsTab(Tab[_TagType], typ.Generic[_TagType], metaclass=abc.ABCMeta):
 
 
 class TagsTab(_TagsTab[model.Tag]):
+    _ADDABLE = False
+
     def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, editable: bool,
+                 tag_types: typ.List[model.TagType], type_labels: typ.Dict[int, str],
                  selection_changed: typ.Optional[typ.Callable[[None], None]] = None,
                  cell_changed: typ.Optional[typ.Callable[[int, int, str], None]] = None,
                  rows_deleted: typ.Optional[typ.Callable[[typ.List[model.Tag]], None]] = None):
@@ -772,6 +1240,8 @@ class TagsTab(_TagsTab[model.Tag]):
         :param owner: Tab’s owner.
         :param dao: The tag’s DAO.
         :param editable: If true the contained table will be editable.
+        :param tag_types: The saved tag types. It is shared with the owner, which keeps it up to date.
+        :param type_labels: The label of each tag type, by ID. It is shared with the owner, which keeps it up to date.
         :param selection_changed: Action called when the selection changes.
         :param cell_changed: Action called when a cell has been edited. It takes the cell’s row, column and text.
         :param rows_deleted: Action called when rows have been deleted. It takes the list of deleted values.
@@ -780,8 +1250,9 @@ class TagsTab(_TagsTab[model.Tag]):
             owner,
             dao,
             _t('dialog.edit_tags.tab.tags.title'),
-            addable=False,
             editable=editable,
+            tag_types=tag_types,
+            type_labels=type_labels,
             tag_class=model.Tag,
             additional_columns=[],
             additional_search_columns=[],
@@ -793,6 +1264,7 @@ class TagsTab(_TagsTab[model.Tag]):
 
 class CompoundTagsTab(_TagsTab[model.CompoundTag]):
     def __init__(self, owner: QtW.QWidget, dao: da.TagsDao, editable: bool,
+                 tag_types: typ.List[model.TagType], type_labels: typ.Dict[int, str],
                  selection_changed: typ.Optional[typ.Callable[[None], None]] = None,
                  cell_changed: typ.Optional[typ.Callable[[int, int, str], None]] = None,
                  rows_deleted: typ.Optional[typ.Callable[[typ.List[model.CompoundTag]], None]] = None):
@@ -801,6 +1273,8 @@ class CompoundTagsTab(_TagsTab[model.CompoundTag]):
         :param owner: Tab’s owner.
         :param dao: The tag’s DAO.
         :param editable: If true the contained table will be editable.
+        :param tag_types: The saved tag types. It is shared with the owner, which keeps it up to date.
+        :param type_labels: The label of each tag type, by ID. It is shared with the owner, which keeps it up to date.
         :param selection_changed: Action called when the selection changes.
         :param cell_changed: Action called when a cell has been edited. It takes the cell’s row, column and text.
         :param rows_deleted: Action called when rows have been deleted. It takes the list of deleted values.
@@ -809,8 +1283,9 @@ class CompoundTagsTab(_TagsTab[model.CompoundTag]):
             owner,
             dao,
             _t('dialog.edit_tags.tab.compound_tags.title'),
-            addable=True,
             editable=editable,
+            tag_types=tag_types,
+            type_labels=type_labels,
             tag_class=model.CompoundTag,
             additional_columns=[
                 (_t('dialog.edit_tags.tab.compound_tags.table.header.definition'), False),
@@ -825,22 +1300,100 @@ class CompoundTagsTab(_TagsTab[model.CompoundTag]):
         super().init()
         self._table.setColumnHidden(self._tag_use_count_column, True)
 
-    def _get_value_for_column(self, column_name: str, tag: model.CompoundTag, default: bool) -> typ.Tuple[str, str]:
+    def _get_value_for_column(self, column_name: str, tag: typ.Optional[model.CompoundTag], default: bool) \
+            -> typ.Tuple[str, str]:
         return (tag.definition if not default else ''), 'definition'
 
     def _check_cell_format(self, row: int, col: int) -> (bool, str):
         ok, message = super()._check_cell_format(row, col)
         if not ok:
             return False, message
-        if col == 2:
-            tag_label = self._table.item(row, 2).text()
-            try:
-                queries.query_to_sympy(tag_label, simplify=False)
-            except ValueError as e:
-                return False, str(e)
+        if col == 2 and (message := _get_definition_error(self._model.columns[2][row])):
+            return False, message
         return True, ''
 
 
-class _IntTableWidgetItem(QtW.QTableWidgetItem):
-    def __lt__(self, other: _IntTableWidgetItem):
-        return int(self.text()) < int(other.text())
+class _SpeedUpDelegate(components.TranslatedItemDelegate):
+    """Delegate that fetches all the data needed to paint a cell of a TagsModel in a single call."""
+
+    def initStyleOption(self, option: QtW.QStyleOptionViewItem, index: QtC.QModelIndex):
+        roles = index.data(TagsModel.MULTIPLE_ROLES)
+        if not isinstance(roles, dict):
+            super().initStyleOption(option, index)
+            return
+
+        option.index = index
+        font = roles[QtC.Qt.FontRole]
+        if font is not None:
+            option.font = font.resolve(option.font)
+            option.fontMetrics = QtG.QFontMetrics(option.font)
+        option.displayAlignment = QtC.Qt.AlignLeft | QtC.Qt.AlignVCenter
+        text = roles[QtC.Qt.DisplayRole]
+        if text is not None:
+            option.features |= QtW.QStyleOptionViewItem.HasDisplay
+            option.text = self.displayText(text, option.locale)
+        background = roles[QtC.Qt.BackgroundRole]
+        if background is not None:
+            option.backgroundBrush = QtG.QBrush(background)
+        foreground = roles[QtC.Qt.ForegroundRole]
+        if foreground is not None:
+            option.palette.setBrush(QtG.QPalette.Text, QtG.QBrush(foreground))
+
+
+class _ColorDelegate(_SpeedUpDelegate):
+    """Delegate that shows a color picker when a color cell is clicked."""
+
+    def __init__(self, editable: bool, parent: QtC.QObject = None):
+        """Creates a delegate.
+
+        :param editable: If false, no color picker will be shown.
+        :param parent: The parent object.
+        """
+        super().__init__(parent=parent)
+        self._editable = editable
+
+    def editorEvent(self, event: QtC.QEvent, model_: QtC.QAbstractItemModel, option: QtW.QStyleOptionViewItem,
+                    index: QtC.QModelIndex) -> bool:
+        if (self._editable and event.type() == QtC.QEvent.MouseButtonRelease
+                and event.button() == QtC.Qt.LeftButton and option.rect.contains(event.pos())):
+            # Set initial color to the cell’s current color
+            color = QtW.QColorDialog.getColor(index.data(QtC.Qt.EditRole), parent=option.widget)
+            if color.isValid():
+                model_.setData(index, color)
+            return True
+        return super().editorEvent(event, model_, option, index)
+
+
+class _TagTypeDelegate(_SpeedUpDelegate):
+    """Delegate that edits the type of tags through a combobox."""
+
+    def __init__(self, tag_types: typ.List[model.TagType], type_labels: typ.Dict[int, str],
+                 parent: QtC.QObject = None):
+        """Creates a delegate.
+
+        :param tag_types: The selectable types. The list may be modified afterwards.
+        :param type_labels: The current label of each type, by ID. The dict may be modified afterwards.
+        :param parent: The parent object.
+        """
+        super().__init__(parent=parent)
+        self._tag_types = tag_types
+        self._type_labels = type_labels
+
+    def createEditor(self, parent: QtW.QWidget, option: QtW.QStyleOptionViewItem, index: QtC.QModelIndex):
+        combo = QtW.QComboBox(parent=parent)
+        combo.addItem(_t('dialog.edit_tags.tab.tags_common.table.combo_no_type'), None)
+        for tag_type in self._tag_types:
+            label = self._type_labels.get(tag_type.id, tag_type.label)
+            combo.addItem(_TagsTab.get_combo_text(tag_type.id, label), tag_type.id)
+        # Apply the selected type right away
+        combo.currentIndexChanged.connect(lambda: self.commitData.emit(combo))
+        return combo
+
+    def setEditorData(self, editor: QtW.QComboBox, index: QtC.QModelIndex):
+        type_id = index.data(QtC.Qt.EditRole)
+        editor.blockSignals(True)
+        editor.setCurrentIndex(max(0, editor.findData(type_id)) if type_id is not None else 0)
+        editor.blockSignals(False)
+
+    def setModelData(self, editor: QtW.QComboBox, model_: QtC.QAbstractItemModel, index: QtC.QModelIndex):
+        model_.setData(index, editor.currentData())
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import abc
+import collections
+import pathlib
 import typing as typ
 
 import PyQt5.QtCore as QtC
@@ -8,7 +10,6 @@ import PyQt5.QtGui as QtG
 import PyQt5.QtWidgets as QtW
 import pyperclip
 
-from . import components, flow_layout
 from .. import config, model, utils
 from ..i18n import translate as _t
 
@@ -110,6 +111,14 @@ class ImageListView:
         """
         pass
 
+    @abc.abstractmethod
+    def set_images(self, images: typ.List[model.Image]):
+        """Replaces all images of this list.
+
+        :param images: The images to display.
+        """
+        pass
+
     @abc.abstractmethod
     def clear(self):
         """Empties this list."""
@@ -180,6 +189,13 @@ class ImageList(QtW.QListWidget, ImageListView):
     def add_image(self, image: model.Image):
         self.addItem(_ImageListItem(self, image))
 
+    def set_images(self, images: typ.List[model.Image]):
+        self.setUpdatesEnabled(False)
+        self.clear()
+        for image in images:
+            self.add_image(image)
+        self.setUpdatesEnabled(True)
+
 
 class _ImageListItem(QtW.QListWidgetItem, ImageItem):
     """This class is used as an item in the ImageList widget."""
@@ -195,8 +211,10 @@ class _ImageListItem(QtW.QListWidgetItem, ImageItem):
         self._image = image
 
 
-class ThumbnailList(flow_layout.ScrollingFlowWidget, ImageListView):
-    """This widget lists results returned by the user query as image thumbnails."""
+class ThumbnailList(QtW.QListView, ImageListView):
+    """This list displays images returned by the user query as thumbnails.
+    Thumbnails are only loaded for visible items and those within a few pages around them.
+    """
 
     def __init__(self, on_selection_changed: SelectionChangeListener,
                  on_item_double_clicked: ItemDoubleClickListener,
@@ -208,187 +226,274 @@ class ThumbnailList(flow_layout.ScrollingFlowWidget, ImageListView):
         :param parent: The widget this list belongs to.
         """
         super().__init__(parent)
-        self._selection_changed = on_selection_changed
-        self._on_item_double_clicked = on_item_double_clicked
-        self._last_index = -1
-        bg_color = QtW.QApplication.palette().color(QtG.QPalette.Normal, QtG.QPalette.Base)
-        self.setStyleSheet(f'background-color: {bg_color.name()}')
+        size = config.CONFIG.thumbnail_size
+        self.setViewMode(QtW.QListView.IconMode)
+        self.setMovement(QtW.QListView.Static)
+        self.setResizeMode(QtW.QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QtC.QSize(size, size))
+        self.setGridSize(QtC.QSize(size + 10, size + self.fontMetrics().height() + 10))
+        self.setTextElideMode(QtC.Qt.ElideMiddle)
+        self.setWordWrap(False)
+        self.setSelectionMode(QtW.QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QtW.QAbstractItemView.NoEditTriggers)
+        # Let file drops through to the main window
+        self.setDragDropMode(QtW.QAbstractItemView.NoDragDrop)
+        self.viewport().setAcceptDrops(False)
+
+        self._model = _ThumbnailsModel(size, parent=self)
         self._init_contextual_menu()
+        self.setModel(self._model)
+        self.selectionModel().selectionChanged.connect(lambda _: on_selection_changed(self.selected_images()))
+        self.doubleClicked.connect(lambda index: on_item_double_clicked(self._model.image(index.row())))
+        self._model.rowsInserted.connect(self._update_actions)
+        self._model.rowsInserted.connect(self._load_thumbnails)
+        self._model.modelReset.connect(self._update_actions)
+
+    def keyPressEvent(self, event: QtG.QKeyEvent):
+        """Handles “Ctrl+A“ and “Ctrl+C“ actions."""
+        if utils.gui.event_matches_action(event, self._select_all_action):
+            self.select_all()
+            event.ignore()
+        if utils.gui.event_matches_action(event, self._copy_paths_action):
+            self.copy_image_paths()
+            event.ignore()
+        super().keyPressEvent(event)
 
-    def _on_selection_changed(self):
+    def selectionChanged(self, selected: QtC.QItemSelection, deselected: QtC.QItemSelection):
+        super().selectionChanged(selected, deselected)
         self._update_actions()
-        self._selection_changed(self.selected_images())
 
     def select_all(self):
-        for item in self._flow_layout.items:
-            item.selected = True
-        self._on_selection_changed()
+        self.selectAll()
 
     def selected_items(self) -> typ.List[ImageItem]:
-        return [item for item in self._flow_layout.items if item.selected]
+        return [self.item(i) for i in self.selected_indexes()]
 
     def selected_images(self) -> typ.List[model.Image]:
-        return [item.image for item in self._flow_layout.items if item.selected]
+        return [self._model.image(i) for i in self.selected_indexes()]
 
     def selected_indexes(self) -> typ.List[int]:
-        return [i for i, item in enumerate(self._flow_layout.items) if item.selected]
+        return sorted(map(QtC.QModelIndex.row, self.selectedIndexes()))
 
     def get_images(self) -> typ.List[model.Image]:
-        return [item.image for item in self._flow_layout.items]
+        return self._model.images
 
-    def item(self, index: int) -> ImageItem:
-        return self._flow_layout.items[index]
+    def item(self, row: int) -> ImageItem:
+        return _ThumbnailItem(self._model.image(row))
 
     def add_image(self, image: model.Image):
-        self.add_widget(_FlowImageItem(image, len(self._flow_layout.items), self._item_clicked,
-                                       self._item_double_clicked))
-        self._update_actions()
+        self._model.add_image(image)
+
+    def set_images(self, images: typ.List[model.Image]):
+        self._model.set_images(images)
+        # Layout is deferred by default, it is needed to find out which items are visible
+        self.doItemsLayout()
+        self._load_thumbnails()
 
     def clear(self):
-        self._flow_layout.clear()
-        self._last_index = -1
-        self._update_actions()
+        self._model.set_images([])
 
     def count(self) -> int:
-        return self._flow_layout.count()
-
-    def mousePressEvent(self, event: QtG.QMouseEvent):
-        if event.button() != QtC.Qt.RightButton:
-            self._last_index = -1
-            self._deselect_except(None)
-        super().mousePressEvent(event)
-
-    def keyPressEvent(self, event: QtG.QKeyEvent):
-        """Handles “Ctrl+A“ and “Ctrl+C“ actions."""
-        if utils.gui.event_matches_action(event, self._select_all_action):
-            self.select_all()
-            event.ignore()
-        elif utils.gui.event_matches_action(event, self._copy_paths_action):
-            self.copy_image_paths()
-            event.ignore()
-        super().keyPressEvent(event)
-
-    def _item_clicked(self, item: _FlowImageItem):
-        """Called when an item is clicked once. It handles Ctrl+Click and Shift+Click actions.
-
-        :param item: The clicked item.
+        return self._model.rowCount()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        super().scrollContentsBy(dx, dy)
+        self._load_thumbnails()
+
+    def resizeEvent(self, event: QtG.QResizeEvent):
+        super().resizeEvent(event)
+        self._load_thumbnails()
+
+    def showEvent(self, event: QtG.QShowEvent):
+        super().showEvent(event)
+        self._load_thumbnails()
+
+    def _load_thumbnails(self):
+        """Requests the thumbnails of visible items then those of items up to two pages before and after them."""
+        if not self.isVisible() or not (count := self._model.rowCount()):
+            return
+        first = self._first_row_below(0)
+        last = min(self._first_row_below(self.viewport().height()), count - 1)
+        page = last - first + 1
+        self._model.load_thumbnails(range(first, last + 1),
+                                    range(max(0, first - 2 * page), min(count, last + 1 + 2 * page)))
+
+    def _first_row_below(self, y: int) -> int:
+        """Returns the index of the first item whose bottom edge is below the given viewport y coordinate.
+        Items are laid out in order, so a binary search is enough.
         """
-        modifiers = QtW.QApplication.keyboardModifiers()
-        if modifiers == QtC.Qt.ControlModifier:
-            if item.selected:
-                item.selected = False
-                self._last_index = -1
-            else:
-                item.selected = True
-                self._last_index = item.index
-        elif modifiers == QtC.Qt.ShiftModifier:
-            self._deselect_except(item)
-            if self._last_index != -1:
-                if self._last_index <= item.index:
-                    items = self._flow_layout.items[self._last_index:item.index + 1]
-                else:
-                    items = self._flow_layout.items[item.index:self._last_index + 1]
-                for i in items:
-                    i.selected = True
+        low, high = 0, self._model.rowCount()
+        while low < high:
+            middle = (low + high) // 2
+            if self.visualRect(self._model.index(middle)).bottom() < y:
+                low = middle + 1
             else:
-                item.selected = True
-                self._last_index = item.index
-        else:
-            self._last_index = item.index
-            item.selected = True
-            self._deselect_except(item)
-        self._on_selection_changed()
+                high = middle
+        return low
 
-    def _item_double_clicked(self, item: _FlowImageItem):
-        self._deselect_except(item)
-        item.selected = True
-        self._last_index = item.index
-        self._on_item_double_clicked(item.image)
 
-    def _deselect_except(self, item: typ.Optional[_FlowImageItem]):
-        """Deselects all items apart from the given one.
+class _ThumbnailItem(ImageItem):
+    """Item returned by ThumbnailList.item()."""
 
-        :param item: The item to keep selected.
-        """
-        for i in self.selected_items():
-            if i is not item:
-                i.selected = False
-        self._on_selection_changed()
+    def __init__(self, image: model.Image):
+        super().__init__()
+        self._image = image
 
 
-class _FlowImageItem(QtW.QFrame, ImageItem):
-    """An widget that displays an image and can be selected.
-    Used by the ThumbnailList class to display images returned by the user query.
+class _ThumbnailsModel(QtC.QAbstractListModel):
+    """Model of the ThumbnailList widget. Thumbnails are decoded by worker threads when first requested;
+    only the most recently displayed ones are kept in memory.
     """
 
-    def __init__(self, image: model.Image, index: int, on_click: typ.Callable[[_FlowImageItem], None],
-                 on_double_click: typ.Callable[[_FlowImageItem], None]):
-        """Creates an image item.
+    _MIN_CACHE_SIZE = 500
 
-        :param image: The image to display.
-        :param index: Item's index.
-        :param on_click: Function to call when this item is clicked.
-        :param on_double_click: Function to call when this item is double-clicked.
-        """
-        super().__init__()
-
-        self._image = image
-        self._index = index
+    def __init__(self, thumbnail_size: int, parent: QtC.QObject = None):
+        """Creates an empty model.
 
-        self._on_click = on_click
-        self._on_double_click = on_double_click
-
-        layout = QtW.QVBoxLayout()
-        layout.setContentsMargins(2, 2, 2, 2)
+        :param thumbnail_size: Thumbnails maximum width and height.
+        :param parent: The object this model belongs to.
+        """
+        super().__init__(parent)
+        self._thumbnail_size = thumbnail_size
+        self._images: typ.List[model.Image] = []
+        self._thumbnails: typ.OrderedDict[int, QtG.QPixmap] = collections.OrderedDict()
+        self._cache_size = self._MIN_CACHE_SIZE
+        self._pending = set()
+        self._placeholder = QtG.QPixmap(thumbnail_size, thumbnail_size)
+        self._placeholder.fill(QtC.Qt.transparent)
+        self._thread_pool = QtC.QThreadPool(parent=self)
+        self._loader_signals = _ThumbnailLoaderSignals(parent=self)
+        self._loader_signals.loaded.connect(self._on_thumbnail_loaded)
+        # Incremented whenever images are replaced to discard thumbnails of previous images
+        self._generation = 0
 
-        self._image_view = components.Canvas(keep_border=False, show_errors=False, parent=self)
-        # Allows file drag-and-drop
-        self._image_view.dragEnterEvent = self.dragEnterEvent
-        self._image_view.dragMoveEvent = self.dragMoveEvent
-        self._image_view.dropEvent = self.dropEvent
-        self._image_view.set_image(self._image.path)
-        size = config.CONFIG.thumbnail_size
-        self._image_view.setFixedSize(QtC.QSize(size, size))
-        self._image_view.mousePressEvent = self.mousePressEvent
-        self._image_view.mouseReleaseEvent = self.mouseReleaseEvent
-        self._image_view.mouseDoubleClickEvent = self.mouseDoubleClickEvent
-        layout.addWidget(self._image_view)
+    @property
+    def images(self) -> typ.List[model.Image]:
+        return list(self._images)
+
+    def image(self, row: int) -> model.Image:
+        return self._images[row]
+
+    def rowCount(self, parent: QtC.QModelIndex = QtC.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._images)
+
+    def data(self, index: QtC.QModelIndex, role: int = QtC.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role in (QtC.Qt.DisplayRole, QtC.Qt.ToolTipRole):
+            return self._images[row].path.name
+        if role == QtC.Qt.DecorationRole:
+            # Thumbnails are requested by the view as this method is also called for layout purposes
+            if (thumbnail := self._thumbnails.get(row)) is not None:
+                self._thumbnails.move_to_end(row)
+                return thumbnail
+            return self._placeholder
+        return None
 
-        text = self._image.path.name
-        label = components.EllipsisLabel(text, parent=self)
-        label.setAlignment(QtC.Qt.AlignCenter)
-        label.setFixedWidth(size)
-        label.setToolTip(text)
-        layout.addWidget(label)
+    def add_image(self, image: model.Image):
+        """Appends an image to this model."""
+        row = len(self._images)
+        self.beginInsertRows(QtC.QModelIndex(), row, row)
+        self._images.append(image)
+        self.endInsertRows()
+
+    def set_images(self, images: typ.List[model.Image]):
+        """Replaces all images of this model. Thumbnails being loaded are discarded."""
+        self.beginResetModel()
+        self._thread_pool.clear()
+        self._generation += 1
+        self._images = list(images)
+        self._thumbnails.clear()
+        self._pending.clear()
+        self.endResetModel()
+
+    def load_thumbnails(self, rows: typ.Sequence[int], lookahead_rows: typ.Sequence[int] = ()):
+        """Requests the thumbnails of the given rows that are not loaded yet.
+        Requests for rows that are not in either argument and have not started yet are cancelled.
+
+        :param rows: Rows to load first.
+        :param lookahead_rows: Rows to load afterwards.
+        """
+        if lookahead_rows:
+            self._thread_pool.clear()
+            self._pending.clear()
+            self._cache_size = max(self._MIN_CACHE_SIZE, 2 * len(lookahead_rows))
+        for priority, rows_ in ((1, rows), (0, lookahead_rows)):
+            for row in rows_:
+                if row not in self._thumbnails and row not in self._pending:
+                    self._pending.add(row)
+                    loader = _ThumbnailLoader(self._generation, row, self._images[row].path, self._thumbnail_size,
+                                              self._loader_signals)
+                    self._thread_pool.start(loader, priority)
+
+    def _on_thumbnail_loaded(self, generation: int, row: int, image: QtG.QImage):
+        """Called when a worker thread has decoded a thumbnail.
+
+        :param generation: Value of the model’s generation counter when the thumbnail was requested.
+        :param row: Row the thumbnail belongs to.
+        :param image: The decoded thumbnail.
+        """
+        if generation != self._generation:
+            return
+        self._pending.discard(row)
+        self._thumbnails[row] = self._render_thumbnail(image)
+        while len(self._thumbnails) > self._cache_size:
+            self._thumbnails.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [QtC.Qt.DecorationRole])
+
+    def _render_thumbnail(self, image: QtG.QImage) -> QtG.QPixmap:
+        """Centers the given thumbnail in a square pixmap so that all items are laid out identically.
+        A gray frame with a message is drawn instead if the image could not be loaded.
+        """
+        pixmap = QtG.QPixmap(self._placeholder)
+        painter = QtG.QPainter(pixmap)
+        if not image.isNull():
+            painter.drawImage((pixmap.width() - image.width()) // 2, (pixmap.height() - image.height()) // 2, image)
+        else:
+            painter.setPen(QtC.Qt.gray)
+            painter.drawRect(pixmap.rect().adjusted(0, 0, -1, -1))
+            painter.drawText(pixmap.rect(), QtC.Qt.AlignCenter, _t('canvas.no_image'))
+        painter.end()
+        return pixmap
 
-        self.setLayout(layout)
 
-        self.selected = False
+class _ThumbnailLoaderSignals(QtC.QObject):
+    """Signals emitted by _ThumbnailLoader objects, as QRunnable cannot define any."""
+    loaded = QtC.pyqtSignal(int, int, QtG.QImage)
 
-    @property
-    def index(self):
-        return self._index
 
-    @property
-    def selected(self):
-        return self._selected
-
-    @selected.setter
-    def selected(self, value: bool):
-        """Toggles selection. Border and background will turn blue whenever this item is selected."""
-        self._selected = value
-        if self._selected:
-            bg_color = QtW.QApplication.palette().color(QtG.QPalette.Active, QtG.QPalette.Highlight)
-            fg_color = QtW.QApplication.palette().color(QtG.QPalette.Active, QtG.QPalette.HighlightedText)
-        else:
-            bg_color = QtW.QApplication.palette().color(QtG.QPalette.Normal, QtG.QPalette.Base)
-            fg_color = QtW.QApplication.palette().color(QtG.QPalette.Normal, QtG.QPalette.Text)
-        self.setStyleSheet(f'background-color: {bg_color.name()}; color: {fg_color.name()}')
+class _ThumbnailLoader(QtC.QRunnable):
+    """Decodes and scales down an image in a worker thread.
+    Only the first frame of animated images is loaded.
+    """
 
-    def mousePressEvent(self, event: QtG.QMouseEvent):
-        # Do not deselect other items if right click on already selected item
-        if event.button() != QtC.Qt.RightButton or not self._selected:
-            self._on_click(self)
+    def __init__(self, generation: int, row: int, image_path: pathlib.Path, size: int,
+                 signals: _ThumbnailLoaderSignals):
+        """Creates a loader for the given image.
 
-    def mouseDoubleClickEvent(self, event: QtG.QMouseEvent):
-        self._on_double_click(self)
+        :param generation: Generation counter of the model that requested the thumbnail.
+        :param row: Row to load the thumbnail of.
+        :param image_path: Path to the image.
+        :param size: Thumbnail’s maximum width and height.
+        :param signals: Object whose loaded signal will be emitted once done.
+        """
+        super().__init__()
+        self._generation = generation
+        self._row = row
+        self._image_path = image_path
+        self._size = size
+        self._signals = signals
+
+    def run(self):
+        if (image := utils.thumbs.CACHE.get(self._image_path, self._size)) is None:
+            reader = QtG.QImageReader(str(self._image_path))
+            size = reader.size()
+            if size.isValid() and (size.width() > self._size or size.height() > self._size):
+                reader.setScaledSize(size.scaled(self._size, self._size, QtC.Qt.KeepAspectRatio))
+            image = reader.read()
+            if not image.isNull():
+                utils.thumbs.CACHE.put(self._image_path, self._size, image)
+        self._signals.loaded.emit(self._generation, self._row, image)
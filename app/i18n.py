@@ -1,4 +1,4 @@
-import collections
+import collections.abc
 import dataclasses
 import json
 import pathlib
@@ -99,7 +99,7 @@ def _build_mapping(json_object: typ.Mapping[str, typ.Union[str, typ.Mapping]], r
             key = k
         if isinstance(v, str):
             mapping[key] = str(v)
-        elif isinstance(v, collections.Mapping):
+        elif isinstance(v, collections.abc.Mapping):
             mapping = dict(mapping, **_build_mapping(v, key))
         else:
             raise ValueError(f'illegal value type "{type(v)}" for translation value')
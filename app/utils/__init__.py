@@ -1 +1 @@
-from . import gui, image, files
+from . import gui, image, files, thumbs
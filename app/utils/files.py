@@ -4,30 +4,38 @@ import pathlib
 import typing as typ
 
 from app import constants
+from ..logging import logger
 
 
-def get_files_from_directory(directory: pathlib.Path, recursive: bool = True) -> typ.List[pathlib.Path]:
-    """Returns all image files contained in the given directory.
+def get_files_from_directory(directory: pathlib.Path, recursive: bool = True) -> typ.Iterator[pathlib.Path]:
+    """Yields all image files contained in the given directory. Directories are walked lazily so that files can be
+    processed before the whole tree has been listed.
 
     :param directory: The directory to look into.
     :param recursive: Whether to return images from all sub-directories.
-    :return: The list of valid image files.
-    :raise RecursionError: If the function reaches a depth of more than 20 sub-directories.
+    :return: An iterator over valid image files.
+    :raise RecursionError: While iterating, if the function reaches a depth of more than 20 sub-directories.
     """
     max_depth = 20
 
-    def aux(root: pathlib.Path, depth: int = 0) -> typ.List[pathlib.Path]:
+    def aux(root: str, depth: int = 0) -> typ.Iterator[pathlib.Path]:
         if depth > max_depth:
             raise RecursionError(max_depth)
-        files = []
-        for f in root.glob('*'):
-            if f.is_dir() and recursive:
-                files.extend(aux(f, depth + 1))
-            elif f.is_file() and accept_image_file(f):
-                files.append(f.absolute())
-        return files
-
-    return aux(directory)
+        try:
+            entries = os.scandir(root)
+        except OSError as e:
+            # Skip unreadable or deleted directories but keep a trace of them
+            logger.exception(e)
+            return
+        with entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if recursive:
+                        yield from aux(entry.path, depth + 1)
+                elif entry.is_file() and accept_image_file(entry.name):
+                    yield pathlib.Path(entry.path)
+
+    return aux(str(directory.absolute()))
 
 
 def accept_image_file(filename: typ.Union[str, pathlib.Path]) -> bool:
@@ -1,4 +1,5 @@
 """Utility functions to display popup messages and file dialogs, and various functions related to Qt."""
+import functools
 import pathlib
 import platform
 import subprocess
@@ -11,6 +12,9 @@ from . import files
 from .. import constants, config
 from ..i18n import translate as _t
 
+# The platform does not change while the app runs
+_OS_NAME = platform.system().lower()
+
 
 def show_info(message: str, title='popup.info.title', parent: QtW.QWidget = None):
     """Shows an information popup.
@@ -207,15 +211,15 @@ def show_file(file_path: pathlib.Path):
         path = str(file_path.absolute())
     except RuntimeError:  # Raised if loop is encountered in path
         return
-    os_name = platform.system().lower()
-    if os_name == 'windows':
-        subprocess.Popen(f'explorer /select,"{path}"')
-    elif os_name == 'linux':
+    if _OS_NAME == 'windows':
+        # Let subprocess quote the path, explorer accepts it as a separate argument
+        subprocess.Popen(['explorer', '/select,', path])
+    elif _OS_NAME == 'linux':
         command = ['dbus-send', '--dest=org.freedesktop.FileManager1', '--type=method_call',
                    '/org/freedesktop/FileManager1', 'org.freedesktop.FileManager1.ShowItems',
                    f'array:string:file:{path}', 'string:""']
         subprocess.Popen(command)
-    elif os_name == 'darwin':  # OS-X
+    elif _OS_NAME == 'darwin':  # OS-X
         subprocess.Popen(['open', '-R', path])
 
 
@@ -245,8 +249,10 @@ def font_color(bg_color: QtG.QColor) -> QtG.QColor:
     return _BLACK if luminance > 0.179 else _WHITE
 
 
+@functools.lru_cache(maxsize=128)
 def icon(icon_name: str, use_theme: bool = True) -> QtG.QIcon:
     """Returns a QIcon for the given icon name.
+    Icons are cached as they are looked up many times; returned objects must not be modified.
 
     :param icon_name: Icon name, without file extension.
     :param use_theme: Whether to icons theme.
@@ -0,0 +1,99 @@
+"""Persistent cache for image thumbnails."""
+import hashlib
+import os
+import pathlib
+import shutil
+import typing as typ
+
+import PyQt5.QtGui as QtG
+
+from .. import constants
+from ..logging import logger
+
+
+class ThumbnailCache:
+    """This class stores scaled down images on disk so that they do not have to be decoded from the original files
+    every time they are displayed.
+
+    Each image gets its own directory, named after a hash of its path, that contains one file per thumbnail size.
+    File names include the image’s modification time so that thumbnails are regenerated whenever it changes.
+    """
+
+    def __init__(self, directory: pathlib.Path, quality: int = 75):
+        """Creates a cache that stores thumbnails in the given directory.
+
+        :param directory: The directory to store thumbnails into. It is created when the first thumbnail is saved.
+        :param quality: Quality of saved thumbnails, between 0 and 100.
+        """
+        self._directory = directory
+        self._quality = quality
+        self._format = None
+
+    def get(self, image_path: pathlib.Path, size: int) -> typ.Optional[QtG.QImage]:
+        """Returns the cached thumbnail for the given image. Can be called from any thread.
+
+        :param image_path: Path to the original image.
+        :param size: Thumbnail’s maximum width and height.
+        :return: The thumbnail or None if it is not in the cache or is outdated.
+        """
+        try:
+            entry = self._entry_path(image_path, size)
+        except OSError:
+            return None
+        if not entry.exists():
+            return None
+        image = QtG.QImage(str(entry))
+        return image if not image.isNull() else None
+
+    def put(self, image_path: pathlib.Path, size: int, image: QtG.QImage) -> bool:
+        """Saves the thumbnail of the given image, replacing any outdated one. Can be called from any thread.
+
+        :param image_path: Path to the original image.
+        :param size: Thumbnail’s maximum width and height.
+        :param image: The thumbnail.
+        :return: True if the thumbnail was saved.
+        """
+        try:
+            entry = self._entry_path(image_path, size)
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            for file in entry.parent.glob(f'*_{size}.*'):
+                if file != entry:
+                    file.unlink()
+            # Write to a temporary file first so that no other thread can read a partially written thumbnail
+            temp_file = entry.with_name(entry.name + '.tmp')
+            if not image.save(str(temp_file), self._get_format(), self._quality):
+                return False
+            os.replace(temp_file, entry)
+        except OSError as e:
+            logger.exception(e)
+            return False
+        return True
+
+    def invalidate(self, image_path: pathlib.Path):
+        """Deletes all thumbnails of the given image.
+
+        :param image_path: Path to the original image.
+        """
+        shutil.rmtree(self._image_directory(image_path), ignore_errors=True)
+
+    def _image_directory(self, image_path: pathlib.Path) -> pathlib.Path:
+        """Returns the directory holding the thumbnails of the given image."""
+        return self._directory / hashlib.blake2b(str(image_path).encode('UTF-8'), digest_size=16).hexdigest()
+
+    def _entry_path(self, image_path: pathlib.Path, size: int) -> pathlib.Path:
+        """Returns the path to the thumbnail of the given image in its current version.
+
+        :raise OSError: If the image’s modification time could not be read.
+        """
+        mtime = image_path.stat().st_mtime_ns
+        return self._image_directory(image_path) / f'{mtime}_{size}.{self._get_format()}'
+
+    def _get_format(self) -> str:
+        """Returns the format thumbnails are saved in: WebP if Qt supports it, PNG otherwise."""
+        if self._format is None:
+            self._format = 'webp' if b'webp' in QtG.QImageWriter.supportedImageFormats() else 'png'
+        return self._format
+
+
+CACHE = ThumbnailCache(constants.THUMBNAILS_CACHE_DIR)
+"""Application-wide thumbnail cache."""
@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+
+import PyQt5.QtCore as QtC
+import PyQt5.QtGui as QtG
+
+from app import data_access as da, model
+from app.data_access import dao
+from .utils import DatabaseTestCase
+
+
+class SharedConnectionsTestCase(DatabaseTestCase):
+    def _run_in_thread(self, function):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(function()))
+        thread.start()
+        thread.join()
+        return results[0]
+
+    def test_other_threads_do_not_see_pending_transactions(self):
+        writer = da.TagsDao(self.database)
+        reader = da.TagsDao(self.database)
+        with writer._lock:
+            writer._connection.execute('BEGIN')
+            writer._connection.execute("INSERT INTO tags (label) VALUES ('pending')")
+            tag = self._run_in_thread(lambda: reader.get_tag_from_label('pending'))
+            writer._connection.rollback()
+        self.assertIsNone(tag)
+
+    def test_data_version_changes_after_write_in_other_thread(self):
+        tags_dao = da.TagsDao(self.database)
+        version = tags_dao.data_version()
+        self._run_in_thread(lambda: tags_dao.add_type(model.TagType(None, 'type', '/', QtG.QColor(0))))
+        self.assertNotEqual(version, tags_dao.data_version())
+
+    def test_data_version_is_same_in_all_threads(self):
+        tags_dao = da.TagsDao(self.database)
+        self.assertEqual(tags_dao.data_version(), self._run_in_thread(tags_dao.data_version))
+
+    def test_close_keeps_connections_of_other_daos_open(self):
+        dao1 = da.TagsDao(self.database)
+        dao2 = da.TagsDao(self.database)
+        dao1.close()
+        dao1.close()
+        self.assertEqual([], dao2.get_all_types())
+
+    def test_close_last_dao_closes_connections(self):
+        tags_dao = da.TagsDao(self.database)
+        key = self.database.absolute()
+        self.assertIn(key, dao._connections)
+        tags_dao.close()
+        self.assertNotIn(key, dao._connections)
+
+    def test_garbage_collected_dao_releases_connections(self):
+        tags_dao = da.TagsDao(self.database)
+        key = self.database.absolute()
+        references = dao._connections[key].references
+        da.ImageDao(self.database).data_version()
+        self.assertEqual(references, dao._connections[key].references)
+        tags_dao.close()
+
+    def test_reopened_connections_have_different_data_versions(self):
+        tags_dao = da.TagsDao(self.database)
+        version = tags_dao.data_version()
+        tags_dao.close()
+        self.assertNotEqual(version, da.TagsDao(self.database).data_version())
+
+
+class ConnectionsPoolTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def _run_in_pool(self, function, runs: int = 1, max_threads: int = 1) -> list:
+        results = []
+        pool = QtC.QThreadPool()
+        pool.setMaxThreadCount(max_threads)
+        for _ in range(runs):
+            pool.start(QtC.QRunnable.create(lambda: results.append(function())))
+        pool.waitForDone()
+        return results
+
+    def test_runnables_reuse_connections(self):
+        connections = self._run_in_pool(lambda: id(self.dao._connection), runs=5)
+        self.assertEqual(1, len(set(connections)))
+
+    def test_connection_is_checked_in_after_runnable(self):
+        self._run_in_pool(lambda: self.dao.get_all_types())
+        self.assertEqual(1, len(self.dao._connections._idle_connections))
+
+    def test_concurrent_runnables_use_different_connections(self):
+        barrier = threading.Barrier(3)
+
+        def get_connection():
+            connection = self.dao._connection
+            barrier.wait(timeout=5)
+            return id(connection)
+
+        self.assertEqual(3, len(set(self._run_in_pool(get_connection, runs=3, max_threads=3))))
+
+    def test_pending_transaction_is_rolled_back_on_check_in(self):
+        def begin():
+            self.dao._connection.execute('BEGIN')
+            self.dao._connection.execute("INSERT INTO tags (label) VALUES ('pending')")
+
+        self._run_in_pool(begin)
+        self.assertEqual([], self.execute("SELECT id FROM tags WHERE label = 'pending'"))
+        self.assertFalse(self.dao._connections._idle_connections[0].in_transaction)
+
+    def test_close_closes_idle_connections(self):
+        self._run_in_pool(lambda: self.dao.get_all_types())
+        connection = self.dao._connections._idle_connections[0]
+        self.dao.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute('SELECT 1')
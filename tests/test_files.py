@@ -0,0 +1,27 @@
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from app.utils import files
+
+
+class GetFilesFromDirectoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        (self.directory / 'sub').mkdir()
+        for name in ('a.png', 'b.txt', 'sub/c.jpg'):
+            (self.directory / name).touch()
+
+    def test_recursive(self):
+        self.assertEqual({self.directory / 'a.png', self.directory / 'sub' / 'c.jpg'},
+                         set(files.get_files_from_directory(self.directory)))
+
+    def test_not_recursive(self):
+        self.assertEqual([self.directory / 'a.png'],
+                         list(files.get_files_from_directory(self.directory, recursive=False)))
+
+    def test_missing_directory_is_logged(self):
+        with self.assertLogs('app.logging.logger', level='ERROR'):
+            self.assertEqual([], list(files.get_files_from_directory(self.directory / 'missing')))
@@ -0,0 +1,157 @@
+import pathlib
+import sqlite3
+
+from app import data_access as da, model
+from .utils import DatabaseTestCase
+
+
+class DeleteImagesTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dao = da.ImageDao(self.database)
+        self.addCleanup(self.dao.close)
+        self.images_number = 2 * da.ImageDao._BATCH_SIZE + 10
+        self.execute('INSERT INTO images (path) VALUES ' + ','.join('(?)' for _ in range(self.images_number)),
+                     *(f'/image{i}.png' for i in range(self.images_number)))
+        self.ids = [ident for ident, in self.execute('SELECT id FROM images ORDER BY id')]
+
+    def _remaining_ids(self) -> list:
+        return [ident for ident, in self.execute('SELECT id FROM images ORDER BY id')]
+
+    def test_delete_images_in_several_batches(self):
+        results = self.dao.delete_images(self.ids[:-1])
+        self.assertEqual(dict.fromkeys(self.ids[:-1], True), results)
+        self.assertEqual(self.ids[-1:], self._remaining_ids())
+
+    def test_delete_images_failing_image_does_not_prevent_others(self):
+        failing_id = self.ids[da.ImageDao._BATCH_SIZE + 1]
+        self.execute(f"CREATE TRIGGER prevent BEFORE DELETE ON images WHEN old.id = {failing_id} "
+                     f"BEGIN SELECT RAISE(ABORT, 'prevented'); END")
+        results = self.dao.delete_images(self.ids)
+        self.assertEqual({**dict.fromkeys(self.ids, True), failing_id: False}, results)
+        self.assertEqual([failing_id], self._remaining_ids())
+
+    def test_delete_images_rolls_back_on_error(self):
+        self.dao._connection.execute('PRAGMA busy_timeout = 0')
+        connection = sqlite3.connect(str(self.database), isolation_level=None)
+        self.addCleanup(connection.close)
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.assertIsNone(self.dao.delete_images(self.ids))
+        finally:
+            connection.rollback()
+        self.assertEqual(self.ids, self._remaining_ids())
+        self.assertFalse(self.dao._connection.in_transaction)
+
+    def test_delete_no_images(self):
+        self.assertEqual({}, self.dao.delete_images([]))
+        self.assertEqual(self.ids, self._remaining_ids())
+
+
+class UpdateImageAndTagsTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dao = da.ImageDao(self.database)
+        self.addCleanup(self.dao.close)
+        self.execute("INSERT INTO images (path) VALUES ('/a.png'), ('/b.png')")
+        self.execute("INSERT INTO tags (label) VALUES ('tag1'), ('tag2')")
+        self.execute('INSERT INTO image_tag (image_id, tag_id) VALUES (1, 1)')
+
+    def _tags(self, image_id: int) -> list:
+        return [label for label, in self.execute(
+            'SELECT label FROM tags JOIN image_tag ON id = tag_id WHERE image_id = ? ORDER BY label', image_id)]
+
+    def _path(self, image_id: int) -> str:
+        return self.execute('SELECT path FROM images WHERE id = ?', image_id)[0][0]
+
+    def test_update_tags_and_path(self):
+        tags = [model.Tag(0, 'tag2', None), model.Tag(0, 'new', None)]
+        self.assertTrue(self.dao.update_image_and_tags(1, tags, pathlib.Path('/c.png'), 3))
+        self.assertEqual(['new', 'tag2'], self._tags(1))
+        self.assertEqual('/c.png', self._path(1))
+        self.assertEqual([(da.ImageDao.encode_hash(3),)], self.execute('SELECT hash FROM images WHERE id = 1'))
+
+    def test_update_tags_only(self):
+        self.assertTrue(self.dao.update_image_and_tags(1, [model.Tag(0, 'tag2', None)], None, None))
+        self.assertEqual(['tag2'], self._tags(1))
+        self.assertEqual('/a.png', self._path(1))
+
+    def test_update_path_only(self):
+        self.assertTrue(self.dao.update_image_and_tags(1, None, pathlib.Path('/c.png'), None))
+        self.assertEqual(['tag1'], self._tags(1))
+        self.assertEqual('/c.png', self._path(1))
+
+    def test_update_rolls_back_on_error(self):
+        # Path is already used by the other image
+        self.assertFalse(self.dao.update_image_and_tags(1, [model.Tag(0, 'new', None)], pathlib.Path('/b.png'), None))
+        self.assertEqual(['tag1'], self._tags(1))
+        self.assertEqual('/a.png', self._path(1))
+        self.assertEqual([], self.execute("SELECT id FROM tags WHERE label = 'new'"))
+
+    def test_update_image_tags(self):
+        self.assertTrue(self.dao.update_image_tags(1, [model.Tag(0, 'tag2', None), model.Tag(0, 'new', None)]))
+        self.assertEqual(['new', 'tag2'], self._tags(1))
+        self.assertEqual('/a.png', self._path(1))
+
+
+class ImagesRegisteredTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dao = da.ImageDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def test_images_registered(self):
+        self.execute("INSERT INTO images (path) VALUES ('/a.png'), ('/c.png')")
+        paths = [pathlib.Path('/a.png'), pathlib.Path('/b.png'), pathlib.Path('/c.png')]
+        self.assertEqual({paths[0], paths[2]}, self.dao.images_registered(paths))
+
+    def test_images_registered_in_several_batches(self):
+        paths = [pathlib.Path(f'/image{i}.png') for i in range(2 * da.ImageDao._BATCH_SIZE + 10)]
+        registered = paths[::3]
+        self.execute('INSERT INTO images (path) VALUES ' + ','.join('(?)' for _ in registered),
+                     *map(str, registered))
+        self.assertEqual(set(registered), self.dao.images_registered(paths))
+
+    def test_images_registered_duplicate_paths(self):
+        self.execute("INSERT INTO images (path) VALUES ('/a.png')")
+        self.assertEqual({pathlib.Path('/a.png')},
+                         self.dao.images_registered([pathlib.Path('/a.png'), pathlib.Path('/a.png')]))
+
+    def test_images_registered_no_paths(self):
+        self.assertEqual(set(), self.dao.images_registered([]))
+
+
+class GetImagesTagsTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.image_dao = da.ImageDao(self.database)
+        self.addCleanup(self.image_dao.close)
+        self.tags_dao = da.TagsDao(self.database)
+        self.addCleanup(self.tags_dao.close)
+        self.execute("INSERT INTO tag_types (label, symbol, color) VALUES ('type1', '@', 0)")
+        self.execute("INSERT INTO tags (label, type_id) VALUES ('tag1', 1), ('tag2', NULL)")
+
+    @staticmethod
+    def _labels(tags_by_image: dict) -> dict:
+        return {image_id: sorted(tag.label for tag in tags) for image_id, tags in tags_by_image.items()}
+
+    def test_get_images_tags(self):
+        self.execute("INSERT INTO images (path) VALUES ('/a.png'), ('/b.png'), ('/c.png')")
+        self.execute('INSERT INTO image_tag (image_id, tag_id) VALUES (1, 1), (1, 2), (2, 2)')
+        result = self.image_dao.get_images_tags([1, 2, 3], self.tags_dao)
+        self.assertEqual({1: ['tag1', 'tag2'], 2: ['tag2'], 3: []}, self._labels(result))
+        types = {tag.label: tag.type for tag in result[1]}
+        self.assertEqual('type1', types['tag1'].label)
+        self.assertIsNone(types['tag2'])
+
+    def test_get_images_tags_in_several_batches(self):
+        images_number = 2 * da.ImageDao._BATCH_SIZE + 10
+        self.execute('INSERT INTO images (path) VALUES ' + ','.join('(?)' for _ in range(images_number)),
+                     *(f'/image{i}.png' for i in range(images_number)))
+        self.execute('INSERT INTO image_tag (image_id, tag_id) SELECT id, 1 FROM images WHERE id % 2 = 0')
+        result = self.image_dao.get_images_tags(list(range(1, images_number + 1)), self.tags_dao)
+        self.assertEqual({i: ['tag1'] if i % 2 == 0 else [] for i in range(1, images_number + 1)},
+                         self._labels(result))
+
+    def test_get_images_tags_no_images(self):
+        self.assertEqual({}, self.image_dao.get_images_tags([], self.tags_dao))
@@ -0,0 +1,90 @@
+from app import data_access as da, model
+from app.gui import application
+from .utils import DatabaseTestCase
+
+
+class SearchCacheTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        application._SearchRunnable._cache.clear()
+        self.execute("INSERT INTO tags (label) VALUES ('tag1')")
+        self.execute("INSERT INTO images (path) VALUES ('/a.png')")
+        self.execute('INSERT INTO image_tag (image_id, tag_id) VALUES (1, 1)')
+        # Keep the shared connection open between searches, as the application does
+        self.dao = da.ImageDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    @staticmethod
+    def _search(query: str) -> list:
+        search = application._SearchRunnable(query)
+        search.run()
+        return [str(image.path) for image in search.fetched_images]
+
+    def test_same_query_is_cached(self):
+        self.assertEqual(['/a.png'], self._search('tag1'))
+        self.assertEqual(1, len(application._SearchRunnable._cache))
+        self.assertEqual(['/a.png'], self._search(' tag1 '))
+        self.assertEqual(1, len(application._SearchRunnable._cache))
+
+    def test_cache_is_not_reused_after_write(self):
+        self.assertEqual(['/a.png'], self._search('tag1'))
+        self.execute("INSERT INTO images (path) VALUES ('/b.png')")
+        self.execute('INSERT INTO image_tag (image_id, tag_id) VALUES (2, 1)')
+        self.assertEqual(['/a.png', '/b.png'], self._search('tag1'))
+
+    def test_compound_tags_are_reloaded_after_write(self):
+        self.execute("INSERT INTO tags (label, definition) VALUES ('comp', 'tag1')")
+        self.assertEqual(['/a.png'], self._search('comp'))
+        tags_dao = da.TagsDao(self.database)
+        self.addCleanup(tags_dao.close)
+        ident = tags_dao.get_tag_from_label('comp').id
+        self.assertTrue(tags_dao.update_tag(model.CompoundTag(ident, 'comp', 'tag1 -tag1')))
+        self.assertEqual([], self._search('comp'))
+
+
+class CompoundTagsTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        application._SearchRunnable._cache.clear()
+        self.execute("INSERT INTO tags (label) VALUES ('tag1'), ('tag2')")
+        self.execute("INSERT INTO images (path) VALUES ('/a.png'), ('/b.png')")
+        self.execute('INSERT INTO image_tag (image_id, tag_id) VALUES (1, 1), (2, 2)')
+        self.dao = da.ImageDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    @staticmethod
+    def _search(query: str) -> application._SearchRunnable:
+        search = application._SearchRunnable(query)
+        search.run()
+        return search
+
+    def _add_compound_tags(self, **definitions: str):
+        for label, definition in definitions.items():
+            self.execute('INSERT INTO tags (label, definition) VALUES (?, ?)', label, definition)
+
+    def test_nested_compound_tags(self):
+        self._add_compound_tags(c1='c2 + tag2', c2='tag1')
+        search = self._search('c1')
+        self.assertFalse(search.failed)
+        self.assertEqual(['/a.png', '/b.png'], [str(image.path) for image in search.fetched_images])
+
+    def test_cycle_fails_queries_using_it(self):
+        self._add_compound_tags(ca='cb', cb='ca', c1='ca + tag1')
+        for query in ('ca', 'cb', 'c1', 'tag2 + cb'):
+            with self.subTest(query=query):
+                self.assertTrue(self._search(query).failed)
+
+    def test_cycle_does_not_fail_other_queries(self):
+        self._add_compound_tags(ca='cb', cb='ca', c1='tag1')
+        for query, expected in (('tag1', ['/a.png']), ('c1 + tag2', ['/a.png', '/b.png'])):
+            with self.subTest(query=query):
+                search = self._search(query)
+                self.assertFalse(search.failed)
+                self.assertEqual(expected, [str(image.path) for image in search.fetched_images])
+
+    def test_too_deep_nesting_fails_queries_using_it(self):
+        depth = application._SearchRunnable._MAXIMUM_DEPTH + 1
+        self._add_compound_tags(**{f'c{i}': f'c{i + 1}' for i in range(depth)}, **{f'c{depth}': 'tag1'})
+        self.assertTrue(self._search('c0').failed)
+        self.assertFalse(self._search(f'c{depth - 1}').failed)
+        self.assertFalse(self._search('tag1').failed)
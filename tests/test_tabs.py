@@ -0,0 +1,59 @@
+from app import data_access as da
+from app.gui import dialogs
+from app.gui.dialogs import _tabs
+from .utils import DatabaseTestCase
+
+
+class TabSearchTestCase(DatabaseTestCase):
+    LABELS = ['ab', 'abc', 'abd', 'abcd', 'xabc', 'a1c', 'ac', 'b_c', 'AbC']
+
+    def setUp(self):
+        super().setUp()
+        self.execute('INSERT INTO tags (label) VALUES ' + ','.join('(?)' for _ in self.LABELS), *self.LABELS)
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+        self.dialog = dialogs.EditTagsDialog(self.dao, editable=False)
+        self.addCleanup(self.dialog.deleteLater)
+        # noinspection PyProtectedMember
+        self.tab = self.dialog._tabs[dialogs.EditTagsDialog._TAGS_TAB]
+        self.tab.load()
+
+    def _search(self, query: str) -> list:
+        pattern = _tabs.compile_search_pattern(query)
+        self.tab.search(pattern, from_start=True)
+        labels = self.tab._model.columns[1]
+        rows = self.tab._search_cache[pattern.pattern][0][1]
+        self.assertEqual([row for row, label in enumerate(labels) if pattern.fullmatch(label)], rows)
+        return sorted((labels[row] for row in rows), key=lambda label: (label.casefold(), label))
+
+    def test_search(self):
+        self.assertEqual(['AbC', 'abc'], self._search('abc'))
+        self.assertEqual(['a1c', 'AbC', 'abc', 'ac'], self._search('a?c'))
+        self.assertEqual(['AbC', 'abc', 'abcd', 'xabc'], self._search('*abc*'))
+
+    def test_typing_narrows_previous_results(self):
+        candidate_rows = self.tab._candidate_rows
+        calls = []
+
+        def spy(*args):
+            calls.append(args)
+            return candidate_rows(*args)
+
+        self.tab._candidate_rows = spy
+        for query, expected in (('a', []), ('ab', ['ab']), ('abc', ['AbC', 'abc']), ('abc*', ['AbC', 'abc', 'abcd']),
+                                ('abc*d', ['abcd'])):
+            with self.subTest(query=query):
+                self.assertEqual(expected, self._search(query))
+        # Only the first query scanned the table
+        self.assertEqual(len(self.tab._search_columns), len(calls))
+
+    def test_narrowing_with_wildcards(self):
+        for query, expected in (('a*', ['a1c', 'ab', 'AbC', 'abc', 'abcd', 'abd', 'ac']),
+                                ('a*c', ['a1c', 'AbC', 'abc', 'ac']), ('a?', ['ab', 'ac']),
+                                ('a?c', ['a1c', 'AbC', 'abc', 'ac'])):
+            with self.subTest(query=query):
+                self.assertEqual(expected, self._search(query))
+
+    def test_shorter_query_is_not_narrowed(self):
+        self.assertEqual(['AbC', 'abc'], self._search('abc'))
+        self.assertEqual(['ab'], self._search('ab'))
@@ -0,0 +1,158 @@
+import PyQt5.QtGui as QtG
+
+from app import data_access as da, model
+from .utils import DatabaseTestCase
+
+
+class ApplyChangesTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO tag_types (label, symbol, color) VALUES ('type1', '@', 0), ('type2', '%', 0)")
+        self.execute("INSERT INTO tags (label) VALUES ('tag1'), ('tag2'), ('tag3')")
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def _labels(self, table: str) -> list:
+        return [label for label, in self.execute(f'SELECT label FROM {table} ORDER BY id')]
+
+    def test_apply_tag_changes(self):
+        results = self.dao.apply_tag_changes(
+            added=[model.CompoundTag(0, 'comp', 'tag1 tag2')],
+            updated=[model.Tag(2, 'renamed', None)],
+            deleted_ids=[3]
+        )
+        self.assertEqual(([True], [True], [True]), results)
+        self.assertEqual(['tag1', 'renamed', 'comp'], self._labels('tags'))
+
+    def test_apply_tag_changes_failing_change_does_not_prevent_others(self):
+        results = self.dao.apply_tag_changes(
+            added=[model.CompoundTag(0, 'tag1', 'tag2'), model.CompoundTag(0, 'comp', 'tag2')],
+            updated=[model.Tag(2, 'tag3', None), model.Tag(1, 'renamed', None)],
+            deleted_ids=[3]
+        )
+        self.assertEqual(([False, True], [True, True], [True]), results)
+        self.assertEqual(['renamed', 'tag3', 'comp'], self._labels('tags'))
+
+    def test_apply_tag_changes_updates_compound_definition(self):
+        self.dao.apply_tag_changes(added=[model.CompoundTag(0, 'comp', 'tag1')], updated=[], deleted_ids=[])
+        ident = self.execute("SELECT id FROM tags WHERE label = 'comp'")[0][0]
+        self.dao.apply_tag_changes(added=[], updated=[model.CompoundTag(ident, 'comp', 'tag2')], deleted_ids=[])
+        self.assertEqual([('tag2',)], self.execute('SELECT definition FROM tags WHERE id = ?', ident))
+
+    def test_apply_type_changes(self):
+        results = self.dao.apply_type_changes(
+            added=[model.TagType(0, 'type3', '&', QtG.QColor(0)), model.TagType(0, 'type4', '@', QtG.QColor(0))],
+            updated=[model.TagType(1, 'renamed', '@', QtG.QColor(0))],
+            deleted_ids=[2]
+        )
+        self.assertEqual(([True, False], [True], [True]), results)
+        self.assertEqual(['renamed', 'type3'], self._labels('tag_types'))
+
+    def test_apply_no_changes(self):
+        self.assertEqual(([], [], []), self.dao.apply_tag_changes(added=[], updated=[], deleted_ids=[]))
+
+
+class GetTagClassesTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def test_get_tag_classes(self):
+        self.execute("INSERT INTO tags (label, definition) VALUES ('tag1', NULL), ('comp', 'tag1')")
+        self.assertEqual({'tag1': model.Tag, 'comp': model.CompoundTag},
+                         self.dao.get_tag_classes(['tag1', 'comp', 'missing', 'tag1']))
+
+    def test_get_tag_classes_in_several_chunks(self):
+        labels = [f'tag{i}' for i in range(2 * da.TagsDao._BATCH_SIZE + 10)]
+        self.execute('INSERT INTO tags (label, definition) VALUES ' + ','.join('(?, ?)' for _ in labels),
+                     *(arg for i, label in enumerate(labels) for arg in (label, 'tag0' if i % 2 else None)))
+        self.assertEqual({label: model.CompoundTag if i % 2 else model.Tag for i, label in enumerate(labels)},
+                         self.dao.get_tag_classes(labels + ['missing']))
+
+    def test_get_tag_classes_no_tags(self):
+        self.assertEqual({}, self.dao.get_tag_classes([]))
+
+
+class CreateTagsFromStringsTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.execute("INSERT INTO tag_types (label, symbol, color) VALUES ('type1', '@', 0), ('type2', '%', 0)")
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def test_create_tags_from_strings(self):
+        tags = self.dao.create_tags_from_strings(['@tag1', 'tag2', '%tag3'])
+        self.assertEqual(['tag1', 'tag2', 'tag3'], [tag.label for tag in tags])
+        self.assertEqual(['type1', None, 'type2'], [tag.type.label if tag.type else None for tag in tags])
+        self.assertTrue(all(tag.id == 0 for tag in tags))
+
+    def test_create_tags_from_strings_same_as_single_string(self):
+        strings = ['@tag1', 'tag2', '%tag3']
+        self.assertEqual([self.dao.create_tag_from_string(s) for s in strings],
+                         self.dao.create_tags_from_strings(strings))
+
+    def test_create_tags_from_strings_unknown_symbol(self):
+        self.execute("DELETE FROM tag_types WHERE symbol = '%'")
+        with self.assertRaises(ValueError):
+            self.dao.create_tags_from_strings(['%tag1'])
+
+
+class GetAllTagsCacheTestCase(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        da.TagsDao._tags_cache.clear()
+        self.execute("INSERT INTO tags (label, definition) VALUES ('tag1', NULL), ('comp', 'tag1')")
+        self.dao = da.TagsDao(self.database)
+        self.addCleanup(self.dao.close)
+
+    def _labels(self, **kwargs) -> list:
+        return [tag.label for tag in self.dao.get_all_tags(**kwargs)]
+
+    def test_results_are_cached(self):
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.assertEqual(1, len(da.TagsDao._tags_cache))
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.assertEqual(1, len(da.TagsDao._tags_cache))
+
+    def test_cached_list_is_a_copy(self):
+        self.dao.get_all_tags().clear()
+        self.assertEqual(['tag1', 'comp'], self._labels())
+
+    def test_arguments_are_cached_separately(self):
+        self.assertEqual(['tag1'], self._labels(tag_class=model.Tag))
+        self.assertEqual(['comp'], self._labels(tag_class=model.CompoundTag))
+        self.assertEqual(['comp', 'tag1'], self._labels(sort_by_label=True))
+        self.assertEqual(3, len(da.TagsDao._tags_cache))
+
+    def test_counts_are_not_cached(self):
+        self.dao.get_all_tags(get_count=True)
+        self.assertEqual(0, len(da.TagsDao._tags_cache))
+
+    def test_cache_hit_runs_no_query(self):
+        self._labels()
+        statements = []
+        self.dao._connections.main.set_trace_callback(statements.append)
+        self.addCleanup(self.dao._connections.main.set_trace_callback, None)
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.assertEqual([], statements)
+
+    def test_cache_is_not_reused_after_external_changes_are_notified(self):
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.execute("INSERT INTO tags (label) VALUES ('tag2')")
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.dao.notify_external_changes()
+        self.assertEqual(['tag1', 'comp', 'tag2'], self._labels())
+
+    def test_cache_is_not_reused_after_write_from_other_dao(self):
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        image_dao = da.ImageDao(self.database)
+        self.addCleanup(image_dao.close)
+        self.execute("INSERT INTO images (path) VALUES ('/a.png')")
+        self.assertTrue(image_dao.update_image_tags(1, [model.Tag(0, 'tag2', None)]))
+        self.assertEqual(['tag1', 'comp', 'tag2'], self._labels())
+
+    def test_cache_is_not_reused_after_write_from_same_dao(self):
+        self.assertEqual(['tag1', 'comp'], self._labels())
+        self.dao.add_compound_tag(model.CompoundTag(0, 'comp2', 'tag1'))
+        self.assertEqual(['tag1', 'comp', 'comp2'], self._labels())
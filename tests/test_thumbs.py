@@ -0,0 +1,60 @@
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+import PyQt5.QtGui as QtG
+
+from app.utils import thumbs
+from .utils import init_app
+
+
+class ThumbnailCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        init_app()
+        self.directory = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.cache = thumbs.ThumbnailCache(self.directory / 'cache')
+        self.image_path = self.directory / 'image.png'
+        self._make_image(QtG.QColor('red')).save(str(self.image_path))
+
+    @staticmethod
+    def _make_image(color: QtG.QColor, size: int = 10) -> QtG.QImage:
+        image = QtG.QImage(size, size, QtG.QImage.Format_RGB32)
+        image.fill(color)
+        return image
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(self.image_path, 10))
+
+    def test_get_missing_file(self):
+        self.assertIsNone(self.cache.get(self.directory / 'missing.png', 10))
+
+    def test_put_then_get(self):
+        self.assertTrue(self.cache.put(self.image_path, 10, self._make_image(QtG.QColor('red'))))
+        image = self.cache.get(self.image_path, 10)
+        self.assertIsNotNone(image)
+        self.assertEqual((10, 10), (image.width(), image.height()))
+        self.assertIsNone(self.cache.get(self.image_path, 20))
+
+    def test_sizes_are_cached_separately(self):
+        self.cache.put(self.image_path, 10, self._make_image(QtG.QColor('red'), 10))
+        self.cache.put(self.image_path, 5, self._make_image(QtG.QColor('red'), 5))
+        self.assertEqual(10, self.cache.get(self.image_path, 10).width())
+        self.assertEqual(5, self.cache.get(self.image_path, 5).width())
+
+    def test_modified_image_is_outdated(self):
+        self.cache.put(self.image_path, 10, self._make_image(QtG.QColor('red')))
+        stat = self.image_path.stat()
+        os.utime(self.image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertIsNone(self.cache.get(self.image_path, 10))
+        # Saving the new version replaces the outdated file
+        self.cache.put(self.image_path, 10, self._make_image(QtG.QColor('blue')))
+        self.assertEqual(1, len(list(self.cache._image_directory(self.image_path).iterdir())))
+
+    def test_invalidate(self):
+        self.cache.put(self.image_path, 10, self._make_image(QtG.QColor('red')))
+        self.cache.invalidate(self.image_path)
+        self.assertIsNone(self.cache.get(self.image_path, 10))
+        self.assertFalse(self.cache._image_directory(self.image_path).exists())
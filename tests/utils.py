@@ -0,0 +1,71 @@
+"""Helpers shared by tests. Tests must be run from the project’s root directory, e.g. with
+``python -m unittest discover -s tests -t .``.
+"""
+import logging
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+# No display is needed to create widgets and pixmaps
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import PyQt5.QtWidgets as QtW
+
+from app import config, constants, i18n
+from app.data_access import db_updater
+
+_app = None
+
+
+def init_app():
+    """Creates the Qt application and loads translations, once per process."""
+    global _app
+    if _app is None:
+        _app = QtW.QApplication.instance() or QtW.QApplication([])
+        i18n.load_languages()
+    return _app
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base class for tests that need a fresh database. It is created in a temporary directory before each test
+    and set as the current config’s database.
+    """
+
+    def setUp(self):
+        init_app()
+        self.directory = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self._redirect_logs()
+        self.database = self.directory / 'library.sqlite3'
+        config.CONFIG = config.Config(i18n.get_language('en'), self.database, True, 100, 50, False)
+        connection = sqlite3.connect(str(self.database))
+        connection.isolation_level = None
+        connection.executescript(constants.DB_SETUP_FILE.read_text(encoding='UTF-8'))
+        connection.close()
+        # Same steps as db_updater.update_database_if_needed for a new database, without the progress dialog
+        db_updater._UpdateThread(True, self.database, 0, '3.1').run()
+
+    def _redirect_logs(self):
+        """Sends errors logged by the app to a file in the test’s directory instead of the app’s log file."""
+        root_logger = logging.getLogger()
+        handlers = root_logger.handlers
+        handler = logging.FileHandler(self.directory / 'errors.log', encoding='UTF-8', delay=True)
+        root_logger.handlers = [handler]
+
+        def restore():
+            root_logger.handlers = handlers
+            handler.close()
+
+        self.addCleanup(restore)
+
+    def execute(self, query: str, *args) -> list:
+        """Runs a query through a connection of its own and returns all resulting rows."""
+        connection = sqlite3.connect(str(self.database))
+        connection.isolation_level = None
+        try:
+            return connection.execute(query, args).fetchall()
+        finally:
+            connection.close()